@@ -0,0 +1,146 @@
+"""
+Content-addressed storage for operation attachments.
+
+Files are kept on local disk under their SHA-256 (`<root>/ab/abcdef...`), so
+uploading the same invoice twice stores it once. Database rows only hold the
+hash: an `Attachment` row describes one upload (name, type, size) and an
+operation points at it through `attachment_id`, which keeps snapshots small.
+
+Blobs are never deleted by the API, since another upload of the same content
+may be referencing them at that moment. `cli.py purge-attachments` removes
+attachment rows no operation points at, then blobs no row points at once
+they are older than a grace period.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from collections.abc import AsyncIterable, Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, exists
+from sqlmodel import Session, select
+
+from ledger import in_batches
+from models import Attachment, Operation
+
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", "attachments")
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+# Unreferenced blobs younger than this are kept, as an upload may be about
+# to reference them.
+ATTACHMENT_PURGE_GRACE = timedelta(hours=1)
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class AttachmentStore:
+    """Files on local disk, named by the SHA-256 of their content."""
+
+    def __init__(self, root: str | Path = ATTACHMENTS_DIR):
+        self.root = Path(root)
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    async def save(
+        self, chunks: AsyncIterable[bytes], max_bytes: int = ATTACHMENT_MAX_BYTES
+    ) -> tuple[str, int]:
+        """
+        Store a streamed file and return its SHA-256 and size.
+
+        The content is hashed while it is written to a temporary file, which
+        is then moved into place, unless the same content is already stored.
+        """
+        staging = self.root / "tmp"
+        await asyncio.to_thread(staging.mkdir, parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        file = tempfile.NamedTemporaryFile(dir=staging, delete=False)
+        try:
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise AttachmentTooLarge()
+                    digest.update(chunk)
+                    await asyncio.to_thread(file.write, chunk)
+                await asyncio.to_thread(file.flush)
+                await asyncio.to_thread(os.fsync, file.fileno())
+            finally:
+                file.close()
+            sha256 = digest.hexdigest()
+            await asyncio.to_thread(self._commit, Path(file.name), sha256)
+        except BaseException:
+            Path(file.name).unlink(missing_ok=True)
+            raise
+        return sha256, size
+
+    def _commit(self, staged: Path, sha256: str):
+        target = self.path(sha256)
+        if target.exists():
+            # Already stored: refresh its age so a purge running now keeps it.
+            os.utime(target)
+            staged.unlink()
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged, target)
+
+    def blobs(self) -> Iterator[tuple[str, float]]:
+        """Yield the SHA-256 and modification time of every stored file."""
+        if not self.root.is_dir():
+            return
+        for shard in self.root.iterdir():
+            if len(shard.name) != 2 or not shard.is_dir():
+                continue
+            for blob in shard.iterdir():
+                yield blob.name, blob.stat().st_mtime
+
+    def delete(self, sha256: str):
+        self.path(sha256).unlink(missing_ok=True)
+
+
+attachment_store = AttachmentStore()
+
+
+def get_attachment_store() -> AttachmentStore:
+    return attachment_store
+
+
+def purge_attachments(
+    session: Session,
+    store: AttachmentStore,
+    grace: timedelta = ATTACHMENT_PURGE_GRACE,
+) -> tuple[int, int]:
+    """
+    Delete unreferenced attachment rows, then unreferenced blobs.
+
+    Row deletions are committed before any file is removed. Returns the
+    number of rows and files removed.
+    """
+    cutoff = datetime.now(UTC) - grace
+    result = session.exec(
+        delete(Attachment).where(
+            Attachment.created_at < cutoff.replace(tzinfo=None),
+            ~exists().where(Operation.attachment_id == Attachment.id),
+        )
+    )
+    rows = result.rowcount
+    session.commit()
+
+    files = 0
+    cutoff_mtime = time.time() - grace.total_seconds()
+    candidates = [sha256 for sha256, mtime in store.blobs() if mtime < cutoff_mtime]
+    for batch in in_batches(candidates):
+        statement = select(Attachment.sha256).where(Attachment.sha256.in_(batch))
+        referenced = set(session.exec(statement).all())
+        for sha256 in batch:
+            if sha256 not in referenced:
+                store.delete(sha256)
+                files += 1
+    return rows, files
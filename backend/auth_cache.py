@@ -0,0 +1,107 @@
+"""
+In-process cache of authenticated associations, keyed by the token subject.
+
+`get_current_association` runs on every API call; caching the principal lets
+it skip the database on the common path. Entries hold detached copies that are
+merged into the request session with `load=False`, so no SELECT is emitted
+while relationships still lazy-load normally. Entries expire after a TTL and
+are dropped whenever an Association row is updated or deleted through the ORM.
+
+That invalidation only reaches the process making the change: with several
+`cli.py serve` workers, the others keep serving the old principal (e.g. after
+a rename or password change) until its TTL runs out. Keep the TTL short.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import Association
+
+# Also bounds how long other workers may see a principal changed elsewhere.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+
+
+class PrincipalCache:
+    """Thread-safe TTL + LRU map from token subject to a detached Association."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Association]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, subject: str) -> Association | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, subject: str, association: Association):
+        if not self.enabled:
+            return
+        columns = inspect(Association).column_attrs
+        detached = Association(
+            **{column.key: getattr(association, column.key) for column in columns}
+        )
+        make_transient_to_detached(detached)
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, detached)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, association_id: str):
+        with self._lock:
+            stale = [
+                subject
+                for subject, (_, association) in self._entries.items()
+                if association.id == association_id
+            ]
+            for subject in stale:
+                del self._entries[subject]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+            }
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Association, "after_update")
+@event.listens_for(Association, "after_delete")
+def _invalidate_principal(mapper, connection, target: Association):
+    principal_cache.invalidate(target.id)
@@ -0,0 +1,95 @@
+"""
+Compare the full and compact association snapshot shapes.
+
+Builds an in-memory association (no database) and pushes it through the same
+response path the snapshot endpoints use: model construction, then
+`model_response`, which renders it with pydantic-core. The stock FastAPI
+path is compared in benchmarks/response_encoding.py.
+
+    python -m benchmarks.association_payload --sizes 10000 100000 1000000
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from models import (
+    Association,
+    Balance,
+    Operation,
+    OperationType,
+    association_to_compact_read,
+    association_to_read,
+)
+from responses import model_response
+
+app = typer.Typer()
+console = Console()
+
+
+def build_association(operations: int, balances: int = 4) -> Association:
+    association = Association(name="Bench", password="x")
+    start = datetime(2020, 1, 1)
+    for index in range(balances):
+        balance = Balance(
+            name=f"Balance {index}",
+            initialAmount=1000.0,
+            association_id=association.id,
+            position=index,
+        )
+        balance.operations = [
+            Operation(
+                name=f"Operation {n}",
+                description="Benchmark operation",
+                group="misc",
+                amount=12.5,
+                type=OperationType.EXPENSE if n % 3 else OperationType.INCOME,
+                date=start + timedelta(minutes=n),
+                balance_id=balance.id,
+            )
+            for n in range(index, operations, balances)
+        ]
+        association.balances.append(balance)
+    return association
+
+
+def measure(association: Association, compact: bool) -> tuple[int, float]:
+    """Return (payload bytes, seconds) for one snapshot response."""
+    started = time.perf_counter()
+    if compact:
+        snapshot = association_to_compact_read(association)
+    else:
+        snapshot = association_to_read(association)
+    body = model_response(snapshot).body
+    return len(body), time.perf_counter() - started
+
+
+@app.command()
+def main(sizes: list[int] = typer.Option([10_000, 100_000, 1_000_000])):
+    table = Table(title="Association snapshot payload")
+    table.add_column("Operations", justify="right")
+    table.add_column("Full size", justify="right")
+    table.add_column("Full time", justify="right")
+    table.add_column("Compact size", justify="right")
+    table.add_column("Compact time", justify="right")
+
+    for size in sizes:
+        association = build_association(size)
+        full_bytes, full_seconds = measure(association, compact=False)
+        compact_bytes, compact_seconds = measure(association, compact=True)
+        table.add_row(
+            f"{size:,}",
+            f"{full_bytes / 1e6:.1f} MB",
+            f"{full_seconds * 1000:.0f} ms",
+            f"{compact_bytes / 1e6:.1f} MB",
+            f"{compact_seconds * 1000:.0f} ms",
+        )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,179 @@
+"""
+Concurrent request throughput of the sync and async database paths.
+
+The same read (association lookup by name, then its balances) is mounted
+three ways on a small FastAPI app and driven concurrently through httpx's
+ASGI transport:
+
+- sync: `def` endpoint with a blocking Session, run in the threadpool
+- blocking: `async def` endpoint with a blocking Session, i.e. how
+  `get_current_association` used to query from the event loop
+- async: `async def` endpoint with an AsyncSession, as the routers now do
+
+Both engines get the same bounded pool. Keep concurrency below `pool_size`:
+beyond it the blocking variant waits for a connection on the event loop
+itself, which can only be released by the loop, so every such request stalls
+the whole app for `pool_timeout` and is counted as an error. Point
+`--database-url` at MariaDB to include network round trips, where the async
+path stops occupying a thread per in-flight query.
+
+    python -m benchmarks.db_throughput --requests 2000 --concurrency 16
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import typer
+from fastapi import Depends, FastAPI
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import to_async_url
+from models import Association, Balance
+
+app = typer.Typer()
+console = Console()
+
+
+def seed(engine, associations: int, balances: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for index in range(associations):
+            association = Association(name=f"asso-{index}", password="x")
+            session.add(association)
+            for position in range(balances):
+                session.add(
+                    Balance(
+                        name=f"Balance {position}",
+                        initialAmount=100.0,
+                        association_id=association.id,
+                        position=position,
+                    )
+                )
+        session.commit()
+
+
+def build_app(engine, async_engine) -> FastAPI:
+    bench = FastAPI()
+
+    def sync_session():
+        with Session(engine) as session:
+            yield session
+
+    async def async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    def read(session: Session, name: str):
+        association = session.exec(
+            select(Association).where(Association.name == name)
+        ).one()
+        statement = select(Balance).where(Balance.association_id == association.id)
+        return len(session.exec(statement).all())
+
+    @bench.get("/sync/{name}")
+    def sync_read(name: str, session: Session = Depends(sync_session)):
+        return read(session, name)
+
+    @bench.get("/blocking/{name}")
+    async def blocking_read(name: str, session: Session = Depends(sync_session)):
+        return read(session, name)
+
+    @bench.get("/async/{name}")
+    async def async_read(name: str, session: AsyncSession = Depends(async_session)):
+        association = (
+            await session.exec(select(Association).where(Association.name == name))
+        ).one()
+        statement = select(Balance).where(Balance.association_id == association.id)
+        return len((await session.exec(statement)).all())
+
+    return bench
+
+
+async def drive(
+    bench: FastAPI, variant: str, requests: int, concurrency: int, associations: int
+) -> dict:
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(f"/{variant}/asso-{index % associations}")
+
+    transport = httpx.ASGITransport(app=bench)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                url = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        latencies = [float("nan")]
+    return {
+        "throughput": (requests - errors) / elapsed,
+        "errors": errors,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+    }
+
+
+@app.command()
+def main(
+    database_url: str = typer.Option(None, help="Defaults to a temporary SQLite file"),
+    requests: int = 2000,
+    concurrency: int = 16,
+    associations: int = 100,
+    balances: int = 5,
+    pool_size: int = 20,
+    pool_timeout: float = 5,
+):
+    if database_url is None:
+        database_url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+    pool = {"pool_size": pool_size, "max_overflow": 0, "pool_timeout": pool_timeout}
+    engine = create_engine(database_url, **pool)
+    async_engine = create_async_engine(to_async_url(database_url), **pool)
+    seed(engine, associations, balances)
+    bench = build_app(engine, async_engine)
+
+    table = Table(title=f"{requests} requests, concurrency {concurrency}")
+    table.add_column("Variant")
+    table.add_column("Requests/s", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("Errors", justify="right")
+    for variant in ("sync", "blocking", "async"):
+        result = asyncio.run(drive(bench, variant, requests, concurrency, associations))
+        table.add_row(
+            variant,
+            f"{result['throughput']:.0f}",
+            f"{result['p50'] * 1000:.1f} ms",
+            f"{result['p99'] * 1000:.1f} ms",
+            str(result["errors"]),
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
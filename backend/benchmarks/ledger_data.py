@@ -0,0 +1,152 @@
+"""
+Seeded synthetic ledgers for benchmarks.
+
+The same seed and sizes always produce the same associations, balances and
+operations, ids included, so runs against different releases load identical
+data. Rows are bulk inserted, then the rollups are rebuilt once.
+
+    python -m benchmarks.ledger_data --database-url sqlite:///bench.db \
+        --associations 10 --balances 5 --operations 10000
+"""
+
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import bcrypt
+import typer
+from rich.console import Console
+from sqlalchemy import Engine, insert
+from sqlmodel import Session, create_engine, select
+
+from ledger import delete_association, rebuild_rollups
+from migrations import run_migrations
+from models import Association, Balance, Operation, OperationType
+from security import BCRYPT_ROUNDS
+
+app = typer.Typer()
+console = Console()
+
+BENCH_PASSWORD = "bench-password"
+GROUPS = ("cotisations", "dons", "evenements", "materiel", "transport", "divers")
+INSERT_BATCH_SIZE = 5000
+# Operations are spread over two years from this date.
+START_DATE = datetime(2023, 1, 1)
+DATE_RANGE_MINUTES = 2 * 365 * 24 * 60
+
+
+@dataclass
+class SeededAssociation:
+    id: str
+    name: str
+    balance_ids: list[str]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _operation_row(rng: random.Random, index: int, balance_ids: list[str]) -> dict:
+    return {
+        "id": _uuid(rng),
+        "name": f"Operation {index}",
+        "description": "Synthetic operation",
+        "group": rng.choice(GROUPS),
+        "amount": rng.randint(100, 200_000) / 100,
+        "type": OperationType.INCOME if rng.random() < 0.3 else OperationType.EXPENSE,
+        "date": START_DATE + timedelta(minutes=rng.randrange(DATE_RANGE_MINUTES)),
+        "invoice": None,
+        "balance_id": rng.choice(balance_ids),
+    }
+
+
+def generate_ledgers(
+    engine: Engine,
+    associations: int = 10,
+    balances: int = 5,
+    operations: int = 1000,
+    seed: int = 0,
+) -> list[SeededAssociation]:
+    """
+    Create `associations` ledgers of `balances` balances and `operations`
+    operations each, all with the password `BENCH_PASSWORD`.
+
+    Ledgers left by an earlier run with the same seed are replaced; other
+    data in the database is left alone.
+    """
+    run_migrations(engine)
+    rng = random.Random(seed)
+    # One hash for every association: bcrypt would dominate seeding otherwise.
+    password = bcrypt.hashpw(
+        BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).decode("utf-8")
+    names = [f"bench-{seed}-{index}" for index in range(associations)]
+
+    seeded = []
+    with Session(engine) as session:
+        statement = select(Association.id).where(Association.name.in_(names))
+        for association_id in session.exec(statement).all():
+            delete_association(session, association_id)
+        session.commit()
+
+        for name in names:
+            association = SeededAssociation(
+                id=_uuid(rng),
+                name=name,
+                balance_ids=[_uuid(rng) for _ in range(balances)],
+            )
+            session.exec(
+                insert(Association),
+                params=[{"id": association.id, "name": name, "password": password}],
+            )
+            session.exec(
+                insert(Balance),
+                params=[
+                    {
+                        "id": balance_id,
+                        "name": f"Balance {position}",
+                        "initialAmount": rng.randint(0, 500_000) / 100,
+                        "incomeTotal": 0,
+                        "expenseTotal": 0,
+                        "association_id": association.id,
+                        "position": position,
+                    }
+                    for position, balance_id in enumerate(association.balance_ids)
+                ],
+            )
+            rows = []
+            for index in range(operations if balances else 0):
+                rows.append(_operation_row(rng, index, association.balance_ids))
+                if len(rows) == INSERT_BATCH_SIZE:
+                    session.exec(insert(Operation), params=rows)
+                    rows = []
+            if rows:
+                session.exec(insert(Operation), params=rows)
+            seeded.append(association)
+
+        rebuild_rollups(session)
+        session.commit()
+    return seeded
+
+
+@app.command()
+def main(
+    database_url: str = typer.Option(...),
+    associations: int = 10,
+    balances: int = 5,
+    operations: int = 1000,
+    seed: int = 0,
+):
+    engine = create_engine(database_url)
+    seeded = generate_ledgers(engine, associations, balances, operations, seed)
+    console.print(
+        f"[bold green]Seeded {len(seeded)} associations "
+        f"({seeded[0].name} ...), password {BENCH_PASSWORD!r}.[/bold green]"
+        if seeded
+        else "[yellow]Nothing to seed.[/yellow]"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,98 @@
+"""
+Compare ways of encoding an association snapshot response.
+
+For the full and compact shapes of an in-memory association, measures:
+
+- stock: FastAPI's path, response-model validation, `jsonable_encoder` and
+  `json.dumps`
+- fast: `FastJSONResponse`, the model rendered by pydantic-core
+- gzip and brotli (when installed): compressing the rendered body as the
+  compression middleware does
+
+    python -m benchmarks.response_encoding --sizes 10000 100000
+"""
+
+import asyncio
+import time
+import zlib
+
+import typer
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.association_payload import build_association
+from compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from models import association_to_compact_read, association_to_read
+from responses import FastJSONResponse
+
+app = typer.Typer()
+console = Console()
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def stock_body(snapshot) -> bytes:
+    field = create_response_field(name="response", type_=type(snapshot))
+    content = asyncio.run(serialize_response(field=field, response_content=snapshot))
+    return JSONResponse(content).body
+
+
+def fast_body(snapshot) -> bytes:
+    return FastJSONResponse(snapshot).body
+
+
+def gzip_body(body: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def brotli_body(body: bytes) -> bytes:
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+@app.command()
+def main(sizes: list[int] = typer.Option([100_000])):
+    table = Table(title="Association snapshot encoding")
+    for column in ("Operations", "Shape", "Method", "Size", "Time"):
+        table.add_column(column, justify="left" if column == "Method" else "right")
+
+    for size in sizes:
+        association = build_association(size)
+        for shape, convert in (
+            ("full", association_to_read),
+            ("compact", association_to_compact_read),
+        ):
+            snapshot = convert(association)
+            stock, stock_seconds = timed(stock_body, snapshot)
+            fast, fast_seconds = timed(fast_body, snapshot)
+            rows = [
+                ("stock JSON", stock, stock_seconds),
+                ("fast JSON", fast, fast_seconds),
+            ]
+            encoders = [("+ gzip", gzip_body)]
+            if brotli is not None:
+                encoders.append(("+ brotli", brotli_body))
+            for name, encode in encoders:
+                compressed, seconds = timed(encode, fast)
+                rows.append((name, compressed, seconds))
+            for method, body, seconds in rows:
+                table.add_row(
+                    f"{size:,}",
+                    shape,
+                    method,
+                    f"{len(body) / 1e6:.2f} MB",
+                    f"{seconds * 1000:.0f} ms",
+                )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
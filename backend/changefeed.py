@@ -0,0 +1,196 @@
+"""
+Fan-out of ledger change events to connected clients.
+
+Writes note what they changed in their session (see `ledger.log_changes`).
+Once the transaction commits, the hub hands one compact event per
+association to its broker, which delivers it to every stream subscribed to
+that association. Events are notifications: clients fetch the rows
+themselves from `/api/associations/{id}/changes`, so an event that is
+dropped or merged with a later one costs nothing but latency.
+
+Brokers decide how events travel between processes:
+
+- `memory` delivers within the current process only.
+- `database` also polls the revisions of subscribed associations, so each
+  worker of a multi-process server picks up writes made by the others, with
+  the change log as the shared channel.
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+from database import async_session_factory, read_router
+from ledger import (
+    EVENT_MAX_CHANGES,
+    PENDING_EVENTS_KEY,
+    add_event_changes,
+    change_event,
+)
+from models import Association, ChangeLog
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "memory")
+EVENTS_POLL_INTERVAL_SECONDS = float(os.getenv("EVENTS_POLL_INTERVAL_SECONDS", "1"))
+# Events waiting for a slow client; further ones are dropped until it catches up.
+EVENTS_QUEUE_SIZE = 100
+
+
+def _offer(queue: asyncio.Queue, payload: dict):
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        pass
+
+
+class EventHub:
+    """Subscriber queues per association, fed by a broker."""
+
+    def __init__(self, broker=None):
+        self.broker = broker or MemoryBroker()
+        self._subscribers: dict[str, set] = defaultdict(set)
+
+    @property
+    def associations(self) -> list[str]:
+        return list(self._subscribers)
+
+    def subscribe(self, association_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(EVENTS_QUEUE_SIZE)
+        self._subscribers[association_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, association_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(association_id, set())
+        subscribers -= {entry for entry in subscribers if entry[1] is queue}
+        if not subscribers:
+            self._subscribers.pop(association_id, None)
+
+    def publish(self, association_id: str, payload: dict):
+        self.broker.publish(self, association_id, payload)
+
+    def deliver(self, association_id: str, payload: dict):
+        """Queue an event for this process's subscribers; safe from any thread."""
+        for loop, queue in list(self._subscribers.get(association_id, ())):
+            try:
+                loop.call_soon_threadsafe(_offer, queue, payload)
+            except RuntimeError:
+                # The subscriber's event loop has been closed.
+                pass
+
+    async def start(self):
+        await self.broker.start(self)
+
+    async def stop(self):
+        await self.broker.stop()
+
+
+class MemoryBroker:
+    def publish(self, hub: EventHub, association_id: str, payload: dict):
+        hub.deliver(association_id, payload)
+
+    async def start(self, hub: EventHub):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class DatabaseBroker:
+    """Deliver local events at once and poll for other processes' writes."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        interval: float = EVENTS_POLL_INTERVAL_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self._interval = interval
+        # Last revision delivered per subscribed association.
+        self._seen: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def publish(self, hub: EventHub, association_id: str, payload: dict):
+        seen = self._seen.get(association_id)
+        if seen is not None and payload["revision"] <= seen:
+            return
+        self._seen[association_id] = payload["revision"]
+        hub.deliver(association_id, payload)
+
+    async def start(self, hub: EventHub):
+        self._task = asyncio.create_task(self._run(hub))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, hub: EventHub):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.poll(hub)
+            except Exception:
+                logger.exception("Polling for change events failed")
+
+    async def poll(self, hub: EventHub):
+        """Deliver an event for each subscribed association whose revision moved."""
+        subscribed = hub.associations
+        for association_id in self._seen.keys() - set(subscribed):
+            del self._seen[association_id]
+        if not subscribed:
+            return
+
+        async with self._session_factory() as session:
+            statement = select(Association.id, Association.revision).where(
+                Association.id.in_(subscribed)
+            )
+            for association_id, revision in (await session.exec(statement)).all():
+                seen = self._seen.setdefault(association_id, revision)
+                if revision <= seen:
+                    continue
+                self._seen[association_id] = revision
+
+                payload = change_event(revision)
+                statement = (
+                    select(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.deleted)
+                    .where(
+                        ChangeLog.association_id == association_id,
+                        ChangeLog.revision > seen,
+                        ChangeLog.revision <= revision,
+                    )
+                    .order_by(ChangeLog.revision, ChangeLog.id)
+                    .limit(EVENT_MAX_CHANGES + 1)
+                )
+                add_event_changes(payload, (await session.exec(statement)).all())
+                hub.deliver(association_id, payload)
+
+
+def create_broker(name: str = EVENTS_BROKER):
+    if name == "memory":
+        return MemoryBroker()
+    if name == "database":
+        return DatabaseBroker(async_session_factory)
+    raise ValueError(f"Unknown EVENTS_BROKER {name!r}")
+
+
+event_hub = EventHub(create_broker())
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_changes(session: Session):
+    for association_id, payload in session.info.pop(PENDING_EVENTS_KEY, {}).items():
+        read_router.mark_written(association_id)
+        event_hub.publish(association_id, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
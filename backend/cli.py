@@ -1,10 +1,16 @@
+import os
+from datetime import timedelta
+
 import typer
 import uvicorn
 from rich.console import Console
 from rich.panel import Panel
-from sqlmodel import SQLModel
+from sqlmodel import Session, SQLModel
 
-from database import engine
+from attachments import attachment_store, purge_attachments
+from database import engine, ensure_engines_for_process
+from ledger import purge_orphans, rebuild_rollups
+from migrations import pending_migrations, run_migrations
 
 app = typer.Typer()
 console = Console()
@@ -25,16 +31,89 @@ def start(host: str = "127.0.0.1", port: int = 8000, reload: bool = True):
     uvicorn.run("main:app", host=host, port=port, reload=reload)
 
 
+@app.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = typer.Option(os.cpu_count() or 1, envvar="WEB_CONCURRENCY"),
+    max_requests: int = 1000,
+    max_requests_jitter: int = 100,
+    timeout: int = 60,
+    graceful_timeout: int = 30,
+):
+    """
+    Start the production server: gunicorn managing uvicorn workers.
+
+    Workers are recycled after --max-requests (plus jitter) and restarted
+    gracefully on SIGHUP. The app is imported in each worker after fork, and
+    each worker resets any database pool it inherited.
+    """
+    if workers > 1:
+        # Workers only see each other's change events through the database.
+        os.environ.setdefault("EVENTS_BROKER", "database")
+
+    from gunicorn.app.base import BaseApplication
+
+    class AbacusServer(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "max_requests": max_requests,
+                "max_requests_jitter": max_requests_jitter,
+                "timeout": timeout,
+                "graceful_timeout": graceful_timeout,
+                "preload_app": False,
+                "post_fork": lambda server, worker: ensure_engines_for_process(),
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app as asgi_app
+
+            return asgi_app
+
+    console.print(
+        Panel(
+            f"Serving Abacus Backend on http://{host}:{port} with {workers} workers",
+            title="Abacus",
+            style="bold green",
+        )
+    )
+    AbacusServer().run()
+
+
 @app.command()
 def setup_db():
     """
-    Create database tables.
+    Create database tables and bring an existing schema up to date.
     """
     console.print("[bold yellow]Creating tables...[/bold yellow]")
-    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
     console.print("[bold green]Tables created successfully.[/bold green]")
 
 
+@app.command()
+def migrate(dry_run: bool = False):
+    """
+    Apply pending schema migrations (new columns and indexes).
+    """
+    pending = pending_migrations(engine)
+    if not pending:
+        console.print("[bold green]Database schema is up to date.[/bold green]")
+        return
+
+    for migration in pending:
+        console.print(f"[yellow]Pending: {migration.name}[/yellow]")
+    if dry_run:
+        return
+
+    applied = run_migrations(engine)
+    console.print(f"[bold green]Applied {len(applied)} migration(s).[/bold green]")
+
+
 @app.command()
 def reset_db():
     """
@@ -51,5 +130,60 @@ def reset_db():
     setup_db()
 
 
+@app.command()
+def rebuild_totals(verify: bool = False):
+    """
+    Recompute balance totals and monthly rollups from the raw operations.
+
+    With --verify, only report mismatches and exit non-zero if any are found.
+    """
+    with Session(engine) as session:
+        mismatches = rebuild_rollups(session, verify_only=verify)
+        for mismatch in mismatches:
+            console.print(f"[yellow]{mismatch}[/yellow]")
+
+        if verify:
+            if mismatches:
+                console.print(f"[bold red]{len(mismatches)} mismatches.[/bold red]")
+                raise typer.Exit(code=1)
+            console.print("[bold green]Rollups are consistent.[/bold green]")
+            return
+
+        session.commit()
+        console.print(
+            f"[bold green]Rollups rebuilt ({len(mismatches)} fixed).[/bold green]"
+        )
+
+
+@app.command("purge-orphans")
+def purge_orphaned_rows(batch_size: int = 500):
+    """
+    Delete balances, operations, rollups and change log entries whose parent
+    row no longer exists, --batch-size rows per transaction.
+    """
+    with Session(engine) as session:
+        counts = purge_orphans(session, batch_size)
+    for table, count in counts.items():
+        console.print(f"[yellow]{table}: {count} orphan(s) deleted[/yellow]")
+    console.print("[bold green]Orphans purged.[/bold green]")
+
+
+@app.command("purge-attachments")
+def purge_unused_attachments(grace_minutes: int = 60):
+    """
+    Delete attachments no operation refers to, then their stored files.
+
+    Files written less than --grace-minutes ago are kept: an upload may be
+    about to refer to them.
+    """
+    with Session(engine) as session:
+        rows, files = purge_attachments(
+            session, attachment_store, timedelta(minutes=grace_minutes)
+        )
+    console.print(
+        f"[bold green]Removed {rows} attachment(s) and {files} file(s).[/bold green]"
+    )
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,178 @@
+"""
+Response compression negotiated from `Accept-Encoding`.
+
+Bodies of compressible types are compressed with brotli when the client
+accepts it and the optional `brotli` package is installed, and with gzip
+otherwise. Whole bodies under COMPRESSION_MINIMUM_SIZE are sent as they are.
+Streamed bodies (exports) are compressed chunk by chunk, with a flush after
+each one so they still arrive progressively.
+
+Server-sent events are never compressed: a compressor holding bytes back
+would delay events. Neither are partial (206) responses, whose ranges refer
+to the uncompressed file.
+
+Compressed responses get a weak ETag, since their bytes differ from the
+uncompressed representation's. A 304 answering a client that holds such a
+copy gets the same weak ETag.
+"""
+
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = 6
+# Brotli's default quality (11) is meant for static assets, not live responses.
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the supported coding the client weighs highest, brotli on ties."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_weight = None, 0.0
+    for coding in supported:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class _Compressor:
+    def __init__(self, coding: str):
+        if coding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def chunk(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compress(body)
+        return data + (self._flush() if more_body else self._finish())
+
+
+def _compressible(headers: Headers, status: int) -> bool:
+    if status in (204, 206, 304) or "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+def _match_revalidated_etag(headers: MutableHeaders, request_headers: Headers):
+    """
+    Give a 304 the validator of the copy it revalidates.
+
+    A compressed 200 carries a weak ETag, but the endpoint answering the
+    conditional request only knows the strong one. When the client holds the
+    weak tag, it is the one echoed back.
+    """
+    etag = headers.get("etag")
+    if not etag or etag.startswith("W/"):
+        return
+    candidates = {
+        tag.strip() for tag in request_headers.get("if-none-match", "").split(",")
+    }
+    if f"W/{etag}" in candidates:
+        headers["ETag"] = f"W/{etag}"
+        headers.add_vary_header("Accept-Encoding")
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        coding = negotiate(request_headers.get("accept-encoding", ""))
+        start = None
+        compressor = None
+
+        async def compressing_send(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows how large it is.
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is None:
+                if compressor is not None:
+                    message = {
+                        "type": "http.response.body",
+                        "body": compressor.chunk(body, more_body),
+                        "more_body": more_body,
+                    }
+                await send(message)
+                return
+
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            if response_start["status"] == 304:
+                _match_revalidated_etag(headers, request_headers)
+            elif _compressible(headers, response_start["status"]):
+                headers.add_vary_header("Accept-Encoding")
+                if coding and (more_body or len(body) >= self.minimum_size):
+                    compressor = _Compressor(coding)
+                    body = compressor.chunk(body, more_body)
+                    headers["Content-Encoding"] = coding
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(body))
+                    # The compressed bytes are another representation, so a
+                    # strong validator no longer applies; If-None-Match still
+                    # matches it with the weak comparison.
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+                    message = {
+                        "type": "http.response.body",
+                        "body": body,
+                        "more_body": more_body,
+                    }
+            await send(response_start)
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
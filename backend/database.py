@@ -1,7 +1,20 @@
+import logging
 import os
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 
 from dotenv import load_dotenv
-from sqlmodel import Session, create_engine
+from fastapi import Depends
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -10,9 +23,305 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-engine = create_engine(DATABASE_URL, echo=True)
 
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_ECHO = _env_flag("DATABASE_ECHO", "false")
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+# Below MariaDB's default wait_timeout (8h) and typical proxy idle timeouts.
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+DATABASE_POOL_PRE_PING = _env_flag("DATABASE_POOL_PRE_PING", "true")
+
+# Comma-separated read replicas, in the same form as DATABASE_URL.
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# After an association writes, its reads stay on the primary for this long so
+# that replication lag never hides its own changes.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# A replica that failed to connect is left out for this long.
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Tracked writes above which the expired ones are dropped.
+STICKY_PRUNE_THRESHOLD = 1000
+
+# Async driver used for each sync driver accepted in DATABASE_URL.
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver URL (e.g. mysql+pymysql://) for its async equivalent."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases")
+    return parsed.set(
+        drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"
+    ).render_as_string(hide_password=False)
+
+
+class PoolWaitStats:
+    """Time spent waiting for a connection from one pool, across its checkouts."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_seconds_total": self.total_seconds,
+                "wait_seconds_max": self.max_seconds,
+                "wait_seconds_avg": (
+                    self.total_seconds / self.checkouts if self.checkouts else 0.0
+                ),
+            }
+
+
+class _TimedCheckout:
+    # Each pool keeps its own stats, so the sync and async engines (and every
+    # replica) are reported apart; a pool recreated by dispose() starts afresh.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+_TIMED_POOLS = {
+    QueuePool: TimedQueuePool,
+    AsyncAdaptedQueuePool: TimedAsyncAdaptedQueuePool,
+}
+
+
+def timed_pool_class(pool_class: type) -> type:
+    """The subclass of `pool_class` that records checkout waits."""
+    if pool_class not in _TIMED_POOLS:
+        _TIMED_POOLS[pool_class] = type(
+            f"Timed{pool_class.__name__}", (_TimedCheckout, pool_class), {}
+        )
+    return _TIMED_POOLS[pool_class]
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Engine keyword arguments from the DATABASE_* environment settings."""
+    options = {"echo": DATABASE_ECHO, "pool_pre_ping": DATABASE_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # SQLite keeps the pool its dialect picks for the file (or memory), with
+        # its own sizing; only checkout waits are timed.
+        pool_class = parsed.get_dialect().get_pool_class(parsed)
+        options["poolclass"] = timed_pool_class(pool_class)
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            pool_timeout=DATABASE_POOL_TIMEOUT,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+        )
+    return options
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            # QueuePool has no public accessor for it.
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    # Pools created outside engine_options() are not timed.
+    stats = getattr(pool, "wait_stats", None) or PoolWaitStats()
+    status.update(stats.snapshot())
+    return status
 
-def get_session():
-    with Session(engine) as session:
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# The sync engine serves the CLI and maintenance tasks; the API uses the async one.
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True)
+)
+replica_engines = [
+    create_async_engine(url, **engine_options(url, is_async=True))
+    for url in map(to_async_url, DATABASE_REPLICA_URLS)
+]
+ENGINE_PID = os.getpid()
+
+
+def ensure_engines_for_process() -> bool:
+    """
+    Give a forked worker its own connection pools.
+
+    Pooled connections inherited from the parent process share sockets with
+    it; `dispose(close=False)` drops them without closing the parent's copies.
+    Returns True when the engines were created in another process.
+    """
+    global ENGINE_PID
+    if ENGINE_PID == os.getpid():
+        return False
+    engine.dispose(close=False)
+    for pooled in (async_engine, *replica_engines):
+        pooled.sync_engine.dispose(close=False)
+    ENGINE_PID = os.getpid()
+    return True
+
+
+# Objects stay loaded after commit: an expired attribute would otherwise need
+# a lazy refresh, which async sessions cannot do implicitly.
+async_session_factory = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    Session factory for work that outlives the request's dependencies.
+
+    Dependencies with `yield` are closed before a streaming response body is
+    sent, so streaming endpoints open their own session from this factory.
+    """
+    return async_session_factory
+
+
+async def get_session(session_factory=Depends(get_session_factory)):
+    async with session_factory() as session:
         yield session
+
+
+# Anything opening a session with `async with factory() as session`.
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+
+class ReadRouter:
+    """
+    Spread read-only sessions over the replicas, round robin.
+
+    A replica that fails to connect is skipped for `retry_seconds`. Reads go
+    to the primary when no replica is usable, and for `sticky_seconds` after
+    the association wrote. Writes are only known to the process that
+    committed them, so with several workers a client served by another one
+    can still read a lagging replica; endpoints that hand out revisions
+    (snapshots and changes) check the replica against the primary's
+    revision instead of relying on this.
+    """
+
+    def __init__(
+        self,
+        replicas: list[async_sessionmaker],
+        sticky_seconds: float = READ_YOUR_WRITES_SECONDS,
+        retry_seconds: float = REPLICA_RETRY_SECONDS,
+    ):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._next = 0
+        self._down_until = [0.0] * len(replicas)
+        # Association id -> time of its last write.
+        self._written: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_written(self, association_id: str):
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._written[association_id] = now
+            if len(self._written) > STICKY_PRUNE_THRESHOLD:
+                self._written = {
+                    key: written
+                    for key, written in self._written.items()
+                    if now - written < self.sticky_seconds
+                }
+
+    def _candidates(self, association_id: str | None) -> list[int]:
+        """Indexes of the replicas to try, in order."""
+        now = time.monotonic()
+        with self._lock:
+            written = self._written.get(association_id)
+            if written is not None and now - written < self.sticky_seconds:
+                return []
+            count = len(self.replicas)
+            first = self._next
+            self._next = (first + 1) % count if count else 0
+            order = [(first + offset) % count for offset in range(count)]
+            return [index for index in order if self._down_until[index] <= now]
+
+    def _mark_down(self, index: int):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    @asynccontextmanager
+    async def session(
+        self, primary: async_sessionmaker, association_id: str | None = None
+    ):
+        """Open a session for reads, on the primary when no replica will do."""
+        for index in self._candidates(association_id):
+            session = self.replicas[index]()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError):
+                logger.warning(
+                    "Read replica %d is unavailable; skipping it for %.0f s",
+                    index,
+                    self.retry_seconds,
+                    exc_info=True,
+                )
+                await session.close()
+                self._mark_down(index)
+                continue
+            async with session:
+                yield session
+            return
+        async with primary() as session:
+            yield session
+
+
+read_router = ReadRouter(
+    [
+        async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+        for replica in replica_engines
+    ]
+)
+
+
+def get_read_router() -> ReadRouter:
+    return read_router
@@ -1,9 +1,20 @@
+from functools import partial
+
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlmodel import Session, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
+from auth_cache import principal_cache
+from database import (
+    ReadRouter,
+    SessionFactory,
+    get_read_router,
+    get_session,
+    get_session_factory,
+)
 from models import Association
 from security import ALGORITHM, SECRET_KEY
 
@@ -26,7 +37,7 @@ async def get_token(request: Request, token: str | None = Depends(oauth2_scheme)
 
 
 async def get_current_association(
-    token: str = Depends(get_token), session: Session = Depends(get_session)
+    token: str = Depends(get_token), session: AsyncSession = Depends(get_session)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,8 +52,40 @@ async def get_current_association(
     except JWTError:
         raise credentials_exception
 
-    statement = select(Association).where(Association.name == name)
-    association = session.exec(statement).first()
+    # Tokens issued since the principal cache carry the association id, which
+    # allows a primary-key lookup; older tokens fall back to the name.
+    association_id = payload.get("aid")
+    cached = principal_cache.get(name)
+    # A cached principal must pass the same subject/id check as a lookup.
+    if cached is not None and association_id in (None, cached.id):
+        return await session.merge(cached, load=False)
+
+    if association_id is not None:
+        association = await session.get(Association, association_id)
+        if association is not None and association.name != name:
+            association = None
+    else:
+        statement = select(Association).where(Association.name == name)
+        association = (await session.exec(statement)).first()
     if association is None:
         raise credentials_exception
+
+    principal_cache.put(name, association)
     return association
+
+
+def get_read_session_factory(
+    current_association: Association = Depends(get_current_association),
+    session_factory: async_sessionmaker = Depends(get_session_factory),
+    read_router: ReadRouter = Depends(get_read_router),
+) -> SessionFactory:
+    """
+    Like `get_session_factory`, for read-only work: sessions open on a read
+    replica unless the association has just written.
+    """
+    return partial(read_router.session, session_factory, current_association.id)
+
+
+async def get_read_session(session_factory=Depends(get_read_session_factory)):
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,55 @@
+"""
+Conditional GET for association snapshots.
+
+Every write to an association's balances or operations bumps
+`Association.revision`, so the revision identifies the snapshot a read
+endpoint would return. Comparing it with `If-None-Match` costs one primary
+key lookup, and an unchanged snapshot is answered with 304 without loading
+balances or operations.
+
+The revision is always read from the primary: a lagging read replica would
+hand out an older tag, and a client caching it would move backwards.
+"""
+
+from fastapi import Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import Association
+
+# Clients may store snapshots but must revalidate them before every use.
+SNAPSHOT_CACHE_CONTROL = "private, no-cache"
+
+
+async def snapshot_revision(session: AsyncSession, association_id: str) -> int | None:
+    """The association's current revision, or None if it does not exist."""
+    statement = select(Association.revision).where(Association.id == association_id)
+    return (await session.exec(statement)).first()
+
+
+def snapshot_etag(association_id: str, revision: int, compact: bool) -> str:
+    """Strong ETag of the association's snapshot at `revision`."""
+    representation = "compact" if compact else "full"
+    return f'"{association_id}.{revision}.{representation}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: a W/ prefix does not matter.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """
+    Set the validator headers and return a 304 response if the client's copy
+    is current; otherwise return None and let the endpoint build the body.
+    """
+    headers = {"ETag": etag, "Cache-Control": SNAPSHOT_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
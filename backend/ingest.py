@@ -0,0 +1,99 @@
+"""
+Incremental parsing of uploaded CSV and NDJSON bodies.
+
+Request bodies arrive as byte chunks; these helpers turn them into
+`(row_number, record)` pairs without ever holding more than one record (plus
+the current chunk) in memory. A record is a dict of raw field values, or an
+error message when the row itself cannot be parsed.
+"""
+
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+NDJSON_CONTENT_TYPES = {
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+    "application/json-lines",
+}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield decoded lines (without line endings) from a stream of byte chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    # Pieces of the current, unfinished line. Only each new chunk is split, so
+    # a line spread over many chunks is joined once instead of rescanned.
+    partial: list[str] = []
+    async for chunk in chunks:
+        first, *rest = decoder.decode(chunk).split("\n")
+        partial.append(first)
+        if not rest:
+            continue
+        yield "".join(partial).removesuffix("\r")
+        *lines, tail = rest
+        partial = [tail]
+        for line in lines:
+            yield line.removesuffix("\r")
+    partial.append(decoder.decode(b"", final=True))
+    if pending := "".join(partial):
+        yield pending.removesuffix("\r")
+
+
+async def iter_csv_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse CSV with a header row.
+
+    Quoted fields may span lines: lines are joined until the record holds an
+    even number of quote characters, as they always do in well-formed CSV.
+    """
+    header = None
+    record: list[str] = []
+    quotes = 0
+    row = 0
+    async for line in iter_lines(chunks):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = "\n".join(record), [], 0
+        if not text.strip():
+            continue
+
+        fields = next(csv.reader([text]))
+        if header is None:
+            header = [field.strip() for field in fields]
+            continue
+
+        row += 1
+        if len(fields) != len(header):
+            yield row, f"Expected {len(header)} fields, got {len(fields)}"
+            continue
+        yield row, dict(zip(header, fields, strict=True))
+
+    if record:
+        yield row + 1, "Unterminated quoted field"
+
+
+async def iter_ndjson_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """Parse one JSON object per non-empty line."""
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row, f"Invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(value, dict):
+            yield row, "Expected a JSON object"
+            continue
+        yield row, value
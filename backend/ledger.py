@@ -0,0 +1,537 @@
+"""
+Ledger bookkeeping shared by the routers.
+
+Each balance carries running income/expense totals and per-month rollup rows
+(`BalanceMonth`). They are adjusted in the same transaction as every operation
+write, so reading a balance's current amount never touches its operations.
+Per-group totals are still computed in the database with SUM/GROUP BY.
+
+Amounts are stored as integer cents (`models.Money`), so SQL sums are exact;
+the few sums done in Python go through cents as well.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import (
+    case,
+    delete,
+    exists,
+    extract,
+    func,
+    insert,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from models import (
+    Association,
+    AssociationSummary,
+    Balance,
+    BalanceCompactRead,
+    BalanceMonth,
+    BalanceSummary,
+    ChangeEntity,
+    ChangeLog,
+    ChangeSet,
+    GroupTotal,
+    Money,
+    MonthTotal,
+    Operation,
+    OperationType,
+    from_cents,
+    to_cents,
+)
+
+_income = func.coalesce(
+    func.sum(case((Operation.type == OperationType.INCOME, Operation.amount), else_=0)),
+    0,
+)
+_expense = func.coalesce(
+    func.sum(
+        case((Operation.type == OperationType.EXPENSE, Operation.amount), else_=0)
+    ),
+    0,
+)
+# INSERT with an upsert clause, per dialect.
+_UPSERTS = {"sqlite": sqlite_insert, "mysql": mysql_insert, "mariadb": mysql_insert}
+_year = extract("year", Operation.date)
+_month = extract("month", Operation.date)
+
+
+def month_key(date: datetime) -> str:
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+def apply_delta(
+    session: Session, balance_id: str, month: str, income: float, expense: float
+):
+    """
+    Add income/expense deltas to a balance's totals and one month's rollup.
+
+    Updates are issued as `column = column + delta` and the month row is
+    upserted in one statement, so concurrent writers on the same balance
+    neither overwrite each other nor race to insert the same month. A month
+    left at zero by a removal is deleted, as `rebuild_rollups` would not
+    create it either.
+    """
+    session.exec(
+        update(Balance)
+        .where(Balance.id == balance_id)
+        .values(
+            incomeTotal=Balance.incomeTotal + income,
+            expenseTotal=Balance.expenseTotal + expense,
+        )
+    )
+
+    dialect = session.get_bind().dialect.name
+    statement = _UPSERTS[dialect](BalanceMonth).values(
+        balance_id=balance_id, month=month, income=income, expense=expense
+    )
+    if dialect == "sqlite":
+        statement = statement.on_conflict_do_update(
+            index_elements=[BalanceMonth.balance_id, BalanceMonth.month],
+            set_={
+                "income": BalanceMonth.income + statement.excluded.income,
+                "expense": BalanceMonth.expense + statement.excluded.expense,
+            },
+        )
+    else:
+        statement = statement.on_duplicate_key_update(
+            income=BalanceMonth.income + statement.inserted.income,
+            expense=BalanceMonth.expense + statement.inserted.expense,
+        )
+    session.exec(statement)
+
+    if income < 0 or expense < 0:
+        session.exec(
+            delete(BalanceMonth).where(
+                BalanceMonth.balance_id == balance_id,
+                BalanceMonth.month == month,
+                BalanceMonth.income == 0,
+                BalanceMonth.expense == 0,
+            )
+        )
+
+
+# Bound on the number of ids in a single IN clause.
+_IN_BATCH_SIZE = 500
+
+# Change events awaiting commit, kept in `session.info` by association id.
+PENDING_EVENTS_KEY = "pending_change_events"
+# Changes listed in one event; larger writes are only flagged as truncated.
+EVENT_MAX_CHANGES = 50
+
+
+def next_revision(session: Session, association_id: str) -> int:
+    """Bump the association's revision and return the new value."""
+    session.exec(
+        update(Association)
+        .where(Association.id == association_id)
+        .values(revision=Association.revision + 1)
+    )
+    statement = select(Association.revision).where(Association.id == association_id)
+    return session.exec(statement).one()
+
+
+def log_changes(
+    session: Session,
+    association_id: str,
+    revision: int,
+    entity: ChangeEntity,
+    entity_ids: Iterable[str],
+    deleted: bool = False,
+):
+    rows = [
+        {
+            "association_id": association_id,
+            "revision": revision,
+            "entity": entity,
+            "entity_id": entity_id,
+            "deleted": deleted,
+        }
+        for entity_id in entity_ids
+    ]
+    if rows:
+        session.exec(insert(ChangeLog), params=rows)
+
+    pending = session.info.setdefault(PENDING_EVENTS_KEY, {})
+    event = pending.setdefault(association_id, change_event(revision))
+    event["revision"] = max(event["revision"], revision)
+    add_event_changes(event, ((entity, row["entity_id"], deleted) for row in rows))
+
+
+def change_event(revision: int) -> dict:
+    """Compact notification that an association changed up to `revision`."""
+    return {"revision": revision, "changes": [], "truncated": False}
+
+
+def add_event_changes(event: dict, changes: Iterable[tuple[str, str, bool]]):
+    for entity, entity_id, deleted in changes:
+        if len(event["changes"]) >= EVENT_MAX_CHANGES:
+            event["truncated"] = True
+            return
+        event["changes"].append(
+            {"entity": ChangeEntity(entity).value, "id": entity_id, "deleted": deleted}
+        )
+
+
+def record_changes(
+    session: Session,
+    association_id: str,
+    entity: ChangeEntity,
+    entity_ids: Iterable[str],
+    deleted: bool = False,
+) -> int:
+    """Bump the association's revision and log what changed at it."""
+    revision = next_revision(session, association_id)
+    log_changes(session, association_id, revision, entity, entity_ids, deleted)
+    return revision
+
+
+def record_operation_changes(
+    session: Session,
+    association_id: str,
+    operation_ids: Iterable[str],
+    balance_ids: Iterable[str],
+    deleted: bool = False,
+) -> int:
+    """
+    Like `record_changes` for operations, also logging the balances they moved.
+
+    Every operation write changes its balance's `currentAmount`, so a client
+    syncing through `changes_since` needs the balance as well: both of them
+    when an update moves the operation to another balance.
+    """
+    revision = next_revision(session, association_id)
+    operations, balances = ChangeEntity.OPERATION, ChangeEntity.BALANCE
+    log_changes(session, association_id, revision, operations, operation_ids, deleted)
+    log_changes(session, association_id, revision, balances, dict.fromkeys(balance_ids))
+    return revision
+
+
+def in_batches(ids: list[str]):
+    """Split ids into chunks small enough for one IN clause."""
+    for start in range(0, len(ids), _IN_BATCH_SIZE):
+        yield ids[start : start + _IN_BATCH_SIZE]
+
+
+def changes_since(session: Session, association_id: str, since: int) -> ChangeSet:
+    """Collect the balances and operations written after revision `since`."""
+    statement = select(Association.revision).where(Association.id == association_id)
+    revision = session.exec(statement).one()
+    if since == revision:
+        return ChangeSet(revision=revision)
+    if since > revision:
+        return ChangeSet(revision=revision, full_resync=True)
+
+    # Every revision logs at least one row, so a log that covers `since` has
+    # an entry at the revision right after it.
+    statement = select(ChangeLog.id).where(
+        ChangeLog.association_id == association_id,
+        ChangeLog.revision == since + 1,
+    )
+    if session.exec(statement).first() is None:
+        return ChangeSet(revision=revision, full_resync=True)
+
+    statement = (
+        select(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.deleted)
+        .where(
+            ChangeLog.association_id == association_id,
+            ChangeLog.revision > since,
+            ChangeLog.revision <= revision,
+        )
+        .order_by(ChangeLog.revision, ChangeLog.id)
+    )
+    entries = session.exec(statement).all()
+
+    # Later entries for the same row supersede earlier ones.
+    latest = {(entity, entity_id): deleted for entity, entity_id, deleted in entries}
+    changes = ChangeSet(revision=revision)
+    upserted = defaultdict(list)
+    for (entity, entity_id), deleted in latest.items():
+        if not deleted:
+            upserted[entity].append(entity_id)
+        elif entity == ChangeEntity.BALANCE:
+            changes.deleted_balances.append(entity_id)
+        else:
+            changes.deleted_operations.append(entity_id)
+
+    for ids in in_batches(upserted[ChangeEntity.BALANCE]):
+        statement = select(Balance).where(
+            Balance.id.in_(ids), Balance.association_id == association_id
+        )
+        changes.balances.extend(
+            BalanceCompactRead(
+                id=balance.id,
+                name=balance.name,
+                initialAmount=balance.initialAmount,
+                currentAmount=balance.currentAmount,
+                position=balance.position,
+            )
+            for balance in session.exec(statement)
+        )
+    for ids in in_batches(upserted[ChangeEntity.OPERATION]):
+        statement = (
+            select(Operation)
+            .join(Balance, Balance.id == Operation.balance_id)
+            .where(Operation.id.in_(ids), Balance.association_id == association_id)
+        )
+        changes.operations.extend(session.exec(statement))
+    return changes
+
+
+def apply_operation(session: Session, operation: Operation, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) an operation from its balance's rollups."""
+    if operation.balance_id is None:
+        return
+
+    delta = operation.amount * sign
+    is_income = operation.type == OperationType.INCOME
+    apply_delta(
+        session,
+        operation.balance_id,
+        month_key(operation.date),
+        delta if is_income else 0,
+        0 if is_income else delta,
+    )
+
+
+def delete_balances(session: Session, balance_ids: list[str]):
+    """
+    Delete balances with their operations and rollups.
+
+    Each table is cleared with one set-based DELETE per batch of balances, so
+    no operation is loaded, and none is left behind with a dangling
+    `balance_id` as an ORM delete of the balance would.
+    """
+    for ids in in_batches(balance_ids):
+        session.exec(delete(BalanceMonth).where(BalanceMonth.balance_id.in_(ids)))
+        session.exec(delete(Operation).where(Operation.balance_id.in_(ids)))
+        session.exec(delete(Balance).where(Balance.id.in_(ids)))
+
+
+def delete_association(session: Session, association_id: str):
+    """Delete an association with its balances, operations and change log."""
+    statement = select(Balance.id).where(Balance.association_id == association_id)
+    delete_balances(session, list(session.exec(statement).all()))
+    session.exec(delete(ChangeLog).where(ChangeLog.association_id == association_id))
+    session.exec(delete(Association).where(Association.id == association_id))
+
+
+def purge_orphans(session: Session, batch_size: int = _IN_BATCH_SIZE) -> dict:
+    """
+    Delete rows whose parent no longer exists, committing after each batch.
+
+    Balances without an association go first, with their operations; then
+    operations, rollups and change log entries left without their parent.
+    Returns the number of rows deleted per table.
+    """
+    counts = {"balance": 0}
+    statement = select(Balance.id).where(
+        ~exists().where(Association.id == Balance.association_id)
+    )
+    while ids := list(session.exec(statement.limit(batch_size))):
+        delete_balances(session, ids)
+        session.commit()
+        counts["balance"] += len(ids)
+
+    for column, parent in (
+        (Operation.id, exists().where(Balance.id == Operation.balance_id)),
+        (
+            BalanceMonth.balance_id,
+            exists().where(Balance.id == BalanceMonth.balance_id),
+        ),
+        (ChangeLog.id, exists().where(Association.id == ChangeLog.association_id)),
+    ):
+        model = column.class_
+        counts[model.__tablename__] = 0
+        statement = select(column).where(~parent).distinct().limit(batch_size)
+        while ids := list(session.exec(statement)):
+            result = session.exec(delete(model).where(column.in_(ids)))
+            session.commit()
+            counts[model.__tablename__] += result.rowcount
+    return counts
+
+
+def _grouped_totals(session: Session, keys: tuple, balance_ids: list[str] | None):
+    """
+    Return (balance_id, *keys, income, expense) rows computed from operations.
+
+    Without `balance_ids`, every balance is covered and orphaned operations
+    are skipped.
+    """
+    statement = select(Operation.balance_id, *keys, _income, _expense).group_by(
+        Operation.balance_id, *keys
+    )
+    if balance_ids is None:
+        statement = statement.join(Balance, Balance.id == Operation.balance_id)
+    else:
+        statement = statement.where(Operation.balance_id.in_(balance_ids))
+    return session.exec(statement).all()
+
+
+def amounts_before(
+    session: Session, balance_ids: list[str], before: datetime
+) -> dict[str, float]:
+    """Net amount (income - expense) of each balance's operations before a date."""
+    # Arithmetic drops the Money type, which would leave the result in cents.
+    statement = (
+        select(Operation.balance_id, type_coerce(_income - _expense, Money))
+        .where(Operation.balance_id.in_(balance_ids), Operation.date < before)
+        .group_by(Operation.balance_id)
+    )
+    return dict(session.exec(statement).all())
+
+
+def _sum(amounts) -> float:
+    return from_cents(sum(to_cents(amount) for amount in amounts))
+
+
+def _merge(totals: dict, key, income: float, expense: float):
+    entry = totals[key]
+    entry[0] = _sum((entry[0], income))
+    entry[1] = _sum((entry[1], expense))
+
+
+def summarize_balances(
+    session: Session, balances: list[Balance]
+) -> list[BalanceSummary]:
+    """Build one BalanceSummary per balance from the rollups plus one GROUP BY."""
+    balance_ids = [balance.id for balance in balances]
+    groups = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0]))
+    months = defaultdict(list)
+
+    if balance_ids:
+        for balance_id, group, income, expense in _grouped_totals(
+            session, (Operation.group,), balance_ids
+        ):
+            _merge(groups[balance_id], group, income, expense)
+
+        statement = (
+            select(BalanceMonth)
+            .where(BalanceMonth.balance_id.in_(balance_ids))
+            .order_by(BalanceMonth.month)
+        )
+        for rollup in session.exec(statement):
+            months[rollup.balance_id].append(
+                MonthTotal(
+                    month=rollup.month, income=rollup.income, expense=rollup.expense
+                )
+            )
+
+    return [
+        BalanceSummary(
+            balance_id=balance.id,
+            name=balance.name,
+            initialAmount=balance.initialAmount,
+            income=balance.incomeTotal,
+            expense=balance.expenseTotal,
+            currentAmount=balance.currentAmount,
+            groups=[
+                GroupTotal(group=group, income=value[0], expense=value[1])
+                for group, value in sorted(groups[balance.id].items())
+            ],
+            months=months[balance.id],
+        )
+        for balance in balances
+    ]
+
+
+def summarize_association(session: Session, association_id: str) -> AssociationSummary:
+    statement = (
+        select(Balance)
+        .where(Balance.association_id == association_id)
+        .order_by(Balance.position)
+    )
+    balances = summarize_balances(session, session.exec(statement).all())
+
+    groups = defaultdict(lambda: [0.0, 0.0])
+    months = defaultdict(lambda: [0.0, 0.0])
+    for balance in balances:
+        for group in balance.groups:
+            _merge(groups, group.group, group.income, group.expense)
+        for month in balance.months:
+            _merge(months, month.month, month.income, month.expense)
+
+    return AssociationSummary(
+        association_id=association_id,
+        income=_sum(balance.income for balance in balances),
+        expense=_sum(balance.expense for balance in balances),
+        currentAmount=_sum(balance.currentAmount for balance in balances),
+        balances=balances,
+        groups=[
+            GroupTotal(group=group, income=value[0], expense=value[1])
+            for group, value in sorted(groups.items())
+        ],
+        months=[
+            MonthTotal(month=month, income=value[0], expense=value[1])
+            for month, value in sorted(months.items())
+        ],
+    )
+
+
+def rebuild_rollups(session: Session, verify_only: bool = False) -> list[str]:
+    """
+    Recompute every balance's totals and monthly rollups from raw operations.
+
+    Returns a description of each mismatch found. Unless `verify_only` is set,
+    the stored rollups are replaced with the recomputed values; the caller
+    commits.
+    """
+    balances = session.exec(select(Balance)).all()
+
+    expected_totals = defaultdict(lambda: [0.0, 0.0])
+    for balance_id, income, expense in _grouped_totals(session, (), None):
+        _merge(expected_totals, balance_id, income, expense)
+
+    expected_months = defaultdict(lambda: [0.0, 0.0])
+    for balance_id, year, month, income, expense in _grouped_totals(
+        session, (_year, _month), None
+    ):
+        key = (balance_id, f"{int(year):04d}-{int(month):02d}")
+        _merge(expected_months, key, income, expense)
+
+    mismatches = []
+    for balance in balances:
+        income, expense = expected_totals.get(balance.id, (0.0, 0.0))
+        if (balance.incomeTotal, balance.expenseTotal) != (income, expense):
+            mismatches.append(
+                f"balance {balance.id}: stored {balance.incomeTotal}/"
+                f"{balance.expenseTotal}, expected {income}/{expense}"
+            )
+            if not verify_only:
+                balance.incomeTotal = income
+                balance.expenseTotal = expense
+                session.add(balance)
+
+    stored_months = {
+        (rollup.balance_id, rollup.month): rollup
+        for rollup in session.exec(select(BalanceMonth)).all()
+    }
+    for key in stored_months.keys() | expected_months.keys():
+        rollup = stored_months.get(key)
+        income, expense = expected_months.get(key, (0.0, 0.0))
+        stored = (rollup.income, rollup.expense) if rollup else (0.0, 0.0)
+        if stored == (income, expense):
+            continue
+        mismatches.append(
+            f"balance {key[0]} month {key[1]}: stored {stored[0]}/{stored[1]}, "
+            f"expected {income}/{expense}"
+        )
+        if verify_only:
+            continue
+        if key not in expected_months:
+            session.delete(rollup)
+            continue
+        if rollup is None:
+            rollup = BalanceMonth(balance_id=key[0], month=key[1])
+        rollup.income = income
+        rollup.expense = expense
+        session.add(rollup)
+
+    return mismatches
@@ -1,12 +1,47 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
-from routers import associations, auth, balances, operations
+from auth_cache import principal_cache
+from changefeed import event_hub
+from compression import CompressionMiddleware
+from database import async_engine, ensure_engines_for_process, pool_status
+from metrics import MetricsMiddleware, request_metrics
+from responses import FastJSONResponse
+from routers import (
+    associations,
+    attachments,
+    auth,
+    balances,
+    batch,
+    events,
+    exports,
+    operations,
+)
+from security import PasswordHasherBusy, password_hasher
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if ensure_engines_for_process():
+        logger.warning(
+            "Database engines were created before fork; reset pools for pid %s",
+            os.getpid(),
+        )
+    await event_hub.start()
+    yield
+    await event_hub.stop()
+    password_hasher.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins = [
     "http://localhost:5173",
@@ -14,6 +49,9 @@ origins = [
     "http://localhost:9873",
 ]
 
+# Innermost first: metrics see the compressed size and include compression time.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -22,11 +60,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many authentication attempts, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(associations.router)
 app.include_router(operations.router)
+app.include_router(attachments.router)
 app.include_router(balances.router)
+app.include_router(batch.router)
+app.include_router(exports.router)
+app.include_router(events.router)
 
 
 @app.get("/health")
@@ -34,6 +86,25 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/health/auth-cache")
+def auth_cache_stats():
+    return principal_cache.stats()
+
+
+@app.get("/health/pool")
+def pool_stats():
+    return pool_status(async_engine)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    if not request_metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        request_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 # Static files (Frontend build serving)
 static_dir = "static"
 if os.path.exists(static_dir):
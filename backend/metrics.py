@@ -0,0 +1,273 @@
+"""
+Per-request performance metrics, exposed in the Prometheus text format.
+
+With METRICS_ENABLED, `MetricsMiddleware` records for every request, labelled
+by route template and method:
+
+- the wall time, until the last byte of the response is sent
+- the number of SQL statements and the time spent executing them, from
+  SQLAlchemy's cursor events on every engine
+- the response size
+- the serialization time: rendering the JSON body in `FastJSONResponse`,
+  which covers the snapshots returned through `model_response` from model to
+  bytes (for other endpoints, FastAPI's own validation and `jsonable_encoder`
+  pass are not included)
+
+`/metrics` serves them as histograms. Each process keeps its own metrics, so
+with several workers each scrape sees one worker.
+
+With SLOW_REQUEST_LOG_MS set, requests slower than that are logged together
+with the statements they executed, whether or not metrics are enabled.
+
+When neither is enabled the middleware hands requests straight to the app
+and the engine listeners return at once.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_TRUE = ("1", "true", "yes", "on")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in _TRUE
+SLOW_REQUEST_LOG_MS = float(os.getenv("SLOW_REQUEST_LOG_MS", "0"))
+# Statements listed in one slow-request log entry, and characters per statement.
+SLOW_REQUEST_MAX_STATEMENTS = 50
+SLOW_REQUEST_STATEMENT_LENGTH = 500
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    # (statement, seconds), only kept for the slow-request log.
+    captured: list | None = None
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@dataclass
+class Histogram:
+    name: str
+    help: str
+    buckets: tuple
+    # Label values -> per-bucket counts (the last one above every bound), then
+    # the sum and the count.
+    series: dict = field(default_factory=dict)
+
+    def observe(self, labels: tuple, value: float):
+        counts = self.series.get(labels)
+        if counts is None:
+            counts = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def render(self, label_names: tuple) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self.series.items()):
+            pairs = ",".join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(label_names, labels, strict=True)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts, strict=False):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{pairs},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{pairs},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{pairs}}} {counts[-2]}")
+            lines.append(f"{self.name}_count{{{pairs}}} {counts[-1]}")
+        return lines
+
+
+class RequestMetrics:
+    """Histograms of every recorded request, keyed by (route, method)."""
+
+    LABELS = ("route", "method")
+
+    def __init__(self, enabled: bool, slow_request_ms: float = 0):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests: dict[tuple, int] = {}
+            self.histograms = {
+                "duration": Histogram(
+                    "abacus_request_duration_seconds",
+                    "Wall time of HTTP requests.",
+                    DURATION_BUCKETS,
+                ),
+                "statements": Histogram(
+                    "abacus_request_db_statements",
+                    "SQL statements executed per HTTP request.",
+                    STATEMENT_BUCKETS,
+                ),
+                "db": Histogram(
+                    "abacus_request_db_duration_seconds",
+                    "Time spent executing SQL statements per HTTP request.",
+                    DURATION_BUCKETS,
+                ),
+                "size": Histogram(
+                    "abacus_response_size_bytes",
+                    "Size of HTTP response bodies.",
+                    SIZE_BUCKETS,
+                ),
+                "serialization": Histogram(
+                    "abacus_response_serialization_seconds",
+                    "Time spent rendering JSON response bodies.",
+                    DURATION_BUCKETS,
+                ),
+            }
+
+    def record(
+        self,
+        route: str,
+        method: str,
+        status: int,
+        seconds: float,
+        size: int,
+        stats: RequestStats,
+    ):
+        labels = (route, method)
+        with self._lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.histograms["duration"].observe(labels, seconds)
+            self.histograms["statements"].observe(labels, stats.statements)
+            self.histograms["db"].observe(labels, stats.db_seconds)
+            self.histograms["size"].observe(labels, size)
+            self.histograms["serialization"].observe(
+                labels, stats.serialization_seconds
+            )
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP abacus_requests_total HTTP requests by response status.",
+                "# TYPE abacus_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'abacus_requests_total{{route="{_escape(route)}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                )
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render(self.LABELS))
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics(METRICS_ENABLED, SLOW_REQUEST_LOG_MS)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are measured to the end."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        metrics = self.metrics
+        if scope["type"] != "http" or not (metrics.enabled or metrics.slow_request_ms):
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(captured=[] if metrics.slow_request_ms else None)
+        token = _current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def measured_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            seconds = time.perf_counter() - started
+            _current_request.reset(token)
+            # The router stores the matched route in the scope; raw paths
+            # would give one series per id.
+            route = scope.get("route")
+            route = getattr(route, "path", UNMATCHED_ROUTE)
+            if metrics.enabled:
+                metrics.record(route, scope["method"], status, seconds, size, stats)
+            if metrics.slow_request_ms and seconds * 1000 >= metrics.slow_request_ms:
+                _log_slow_request(scope, route, status, seconds, stats)
+
+
+def _log_slow_request(scope, route: str, status: int, seconds: float, stats):
+    lines = [
+        f"Slow request: {scope['method']} {scope['path']} ({route}) -> {status} "
+        f"in {seconds * 1000:.0f} ms; {stats.statements} SQL statements in "
+        f"{stats.db_seconds * 1000:.0f} ms, serialization "
+        f"{stats.serialization_seconds * 1000:.0f} ms"
+    ]
+    for statement, elapsed in stats.captured[:SLOW_REQUEST_MAX_STATEMENTS]:
+        statement = " ".join(statement.split())[:SLOW_REQUEST_STATEMENT_LENGTH]
+        lines.append(f"  {elapsed * 1000:8.1f} ms  {statement}")
+    if len(stats.captured) > SLOW_REQUEST_MAX_STATEMENTS:
+        omitted = len(stats.captured) - SLOW_REQUEST_MAX_STATEMENTS
+        lines.append(f"  ... {omitted} more")
+    logger.warning("\n".join(lines))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    if stats.captured is not None:
+        stats.captured.append((statement, elapsed))
+
+
+class SerializationTimer:
+    """Count the time spent in the block as the current request's serialization."""
+
+    def __enter__(self):
+        self.stats = _current_request.get()
+        if self.stats is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.stats is not None:
+            self.stats.serialization_seconds += time.perf_counter() - self.started
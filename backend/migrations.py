@@ -0,0 +1,237 @@
+"""
+Incremental schema migrations for existing databases.
+
+`SQLModel.metadata.create_all` only creates missing tables: it never adds
+columns or indexes to tables that already exist. Each migration below is
+idempotent (it inspects the live schema, or markers it wrote itself, and only
+applies what is missing) and is recorded in the `schemamigration` table once
+applied, so `cli.py migrate` can be run safely on fresh and existing
+databases alike.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import Column, Connection, Engine, Index, Integer, inspect
+from sqlmodel import Field, Session, SQLModel, select
+
+from ledger import rebuild_rollups
+from models import (
+    Association,
+    Attachment,
+    Balance,
+    BalanceMonth,
+    ChangeLog,
+    Operation,
+)
+
+
+class SchemaMigration(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    applied_at: datetime
+
+
+@dataclass(frozen=True)
+class Migration:
+    name: str
+    upgrade: Callable[[Connection], None]
+    # Recompute balance rollups once all pending migrations have been applied.
+    rebuild_rollups: bool = False
+
+
+def _add_column(connection: Connection, column: Column):
+    table = column.table.name
+    existing = {c["name"] for c in inspect(connection).get_columns(table)}
+    if column.name in existing:
+        return
+
+    preparer = connection.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=connection.dialect)
+    ddl = (
+        f"ALTER TABLE {preparer.quote(table)} "
+        f"ADD COLUMN {preparer.quote(column.name)} {column_type}"
+    )
+    if not column.nullable:
+        ddl += " NOT NULL"
+    if column.default is not None and column.default.is_scalar:
+        ddl += f" DEFAULT {column.default.arg!r}"
+    connection.exec_driver_sql(ddl)
+
+
+def _create_index(connection: Connection, index: Index):
+    existing = {i["name"] for i in inspect(connection).get_indexes(index.table.name)}
+    if index.name not in existing:
+        index.create(connection)
+
+
+def _index(table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+def _balance_rollups(connection: Connection):
+    balance = Balance.__table__
+    _add_column(connection, balance.c.incomeTotal)
+    _add_column(connection, balance.c.expenseTotal)
+
+
+def _association_revision(connection: Connection):
+    _add_column(connection, Association.__table__.c.revision)
+
+
+def _change_log(connection: Connection):
+    ChangeLog.__table__.create(connection, checkfirst=True)
+
+
+INTEGER_CENTS = "0005_integer_cents"
+MONEY_COLUMNS = [
+    Balance.__table__.c.initialAmount,
+    Balance.__table__.c.incomeTotal,
+    Balance.__table__.c.expenseTotal,
+    Operation.__table__.c.amount,
+    BalanceMonth.__table__.c.income,
+    BalanceMonth.__table__.c.expense,
+]
+
+
+def _replace_with_integer_column(
+    connection: Connection, column: Column, expression: str
+):
+    """
+    Swap a SQLite column for a BIGINT one holding `expression` of the old one.
+
+    SQLite cannot change a column's type, and a REAL column would store the
+    scaled values as floats. Needs SQLite 3.35 for DROP COLUMN.
+    """
+    preparer = connection.dialect.identifier_preparer
+    table = preparer.quote(column.table.name)
+    old = preparer.quote(column.name)
+    new = preparer.quote(f"{column.name}_cents")
+    existing = {c["name"] for c in inspect(connection).get_columns(column.table.name)}
+    # Left behind by an interrupted run, if the driver committed its ALTER.
+    if f"{column.name}_cents" in existing:
+        connection.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {new}")
+    connection.exec_driver_sql(
+        f"ALTER TABLE {table} ADD COLUMN {new} BIGINT NOT NULL DEFAULT 0"
+    )
+    connection.exec_driver_sql(
+        f"UPDATE {table} SET {new} = CAST({expression.format(old)} AS INTEGER)"
+    )
+    connection.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {old}")
+    connection.exec_driver_sql(f"ALTER TABLE {table} RENAME COLUMN {new} TO {old}")
+
+
+def _integer_cents(connection: Connection):
+    """
+    Convert float amounts to integer cents.
+
+    Columns declared as integers were created in cents and are left alone.
+    Every other column is scaled once: a marker row in `schemamigration`,
+    written in the same transaction as the scaling UPDATE, records it, so an
+    interrupted run never scales a column twice when it is run again.
+
+    On SQLite the column is replaced by an integer one. Elsewhere it is
+    widened to DOUBLE before scaling, since MariaDB's FLOAT is single
+    precision, and then changed to BIGINT. MariaDB commits before each ALTER,
+    so that last ALTER commits the UPDATE with its marker; when it fails, the
+    next run only repeats the ALTER.
+    """
+    preparer = connection.dialect.identifier_preparer
+    is_sqlite = connection.dialect.name == "sqlite"
+    statement = select(SchemaMigration.name).where(
+        SchemaMigration.name.startswith(f"{INTEGER_CENTS}:")
+    )
+    scaled = set(connection.execute(statement).scalars())
+    for column in MONEY_COLUMNS:
+        table = column.table.name
+        current = next(
+            c
+            for c in inspect(connection).get_columns(table)
+            if c["name"] == column.name
+        )
+        if isinstance(current["type"], Integer):
+            continue
+
+        marker = f"{INTEGER_CENTS}:{table}.{column.name}"
+        quoted_table = preparer.quote(table)
+        quoted_column = preparer.quote(column.name)
+        if marker not in scaled and not is_sqlite:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {quoted_table} MODIFY {quoted_column} DOUBLE NOT NULL"
+            )
+        if marker not in scaled:
+            connection.execute(
+                SchemaMigration.__table__.insert().values(
+                    name=marker, applied_at=datetime.now(UTC)
+                )
+            )
+        expression = "{}" if marker in scaled else "ROUND({} * 100)"
+        if is_sqlite:
+            _replace_with_integer_column(connection, column, expression)
+            continue
+
+        if marker not in scaled:
+            connection.exec_driver_sql(
+                f"UPDATE {quoted_table} "
+                f"SET {quoted_column} = {expression.format(quoted_column)}"
+            )
+        ddl = f"ALTER TABLE {quoted_table} MODIFY {quoted_column} BIGINT NOT NULL"
+        if column.default is not None and column.default.is_scalar:
+            ddl += f" DEFAULT {column.default.arg!r}"
+        connection.exec_driver_sql(ddl)
+
+
+def _hot_path_indexes(connection: Connection):
+    _create_index(connection, _index(Association.__table__, "ix_association_name"))
+    _create_index(
+        connection, _index(Balance.__table__, "ix_balance_association_id_position")
+    )
+    _create_index(
+        connection, _index(Operation.__table__, "ix_operation_balance_id_date")
+    )
+
+
+def _operation_attachments(connection: Connection):
+    Attachment.__table__.create(connection, checkfirst=True)
+    operation = Operation.__table__
+    _add_column(connection, operation.c.attachment_id)
+    _create_index(connection, _index(operation, "ix_operation_attachment_id"))
+
+
+MIGRATIONS = [
+    Migration("0001_balance_rollups", _balance_rollups, rebuild_rollups=True),
+    Migration("0002_hot_path_indexes", _hot_path_indexes),
+    Migration("0003_association_revision", _association_revision),
+    Migration("0004_change_log", _change_log),
+    Migration(INTEGER_CENTS, _integer_cents, rebuild_rollups=True),
+    Migration("0006_operation_attachments", _operation_attachments),
+]
+
+
+def pending_migrations(engine: Engine) -> list[Migration]:
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with Session(engine) as session:
+        applied = set(session.exec(select(SchemaMigration.name)).all())
+    return [migration for migration in MIGRATIONS if migration.name not in applied]
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Create missing tables, apply pending migrations and return their names."""
+    SQLModel.metadata.create_all(engine)
+    pending = pending_migrations(engine)
+
+    for migration in pending:
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(
+                SchemaMigration.__table__.insert().values(
+                    name=migration.name, applied_at=datetime.now(UTC)
+                )
+            )
+
+    if any(migration.rebuild_rollups for migration in pending):
+        with Session(engine) as session:
+            rebuild_rollups(session)
+            session.commit()
+
+    return [migration.name for migration in pending]
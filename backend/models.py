@@ -1,52 +1,155 @@
 import uuid
-from datetime import datetime
+from datetime import UTC, datetime
+from decimal import ROUND_HALF_UP, Decimal
 from enum import Enum
 
+from sqlalchemy import BigInteger, Index, TypeDecorator
 from sqlmodel import Field, Relationship, SQLModel
 
 
+def to_cents(amount: float | Decimal | str) -> int:
+    """Round an amount to a whole number of cents (half away from zero)."""
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def from_cents(cents: int | Decimal) -> float:
+    return float(Decimal(cents) / 100)
+
+
+class Money(TypeDecorator):
+    """
+    Amount stored as an integer number of cents.
+
+    Python code and the API keep working with float amounts, rounded to the
+    cent on the way in, while sums computed in SQL are exact integer sums.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
+
+
 class OperationType(str, Enum):
     INCOME = "income"
     EXPENSE = "expense"
 
 
+class ChangeEntity(str, Enum):
+    BALANCE = "balance"
+    OPERATION = "operation"
+
+
 class Association(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    name: str
+    name: str = Field(index=True, unique=True)
     password: str
+    # Bumped by every write to the association's balances or operations, so
+    # snapshot readers can tell whether anything changed (see etags.py).
+    revision: int = Field(default=0)
 
     balances: list["Balance"] = Relationship(back_populates="association")
 
 
 class Balance(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_balance_association_id_position", "association_id", "position"),
+    )
+
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     name: str
-    initialAmount: float
+    initialAmount: float = Field(sa_type=Money)
     association_id: str | None = Field(default=None, foreign_key="association.id")
 
     association: Association | None = Relationship(back_populates="balances")
     operations: list["Operation"] = Relationship(back_populates="balance")
     position: int = Field(default=0)
+    # Running totals of the balance's operations, maintained on every write.
+    incomeTotal: float = Field(default=0, sa_type=Money)
+    expenseTotal: float = Field(default=0, sa_type=Money)
+
+    @property
+    def currentAmount(self) -> float:
+        return from_cents(
+            to_cents(self.initialAmount)
+            + to_cents(self.incomeTotal)
+            - to_cents(self.expenseTotal)
+        )
+
+
+class Attachment(SQLModel, table=True):
+    """
+    A file attached to an operation.
+
+    The bytes live in the attachment store (see attachments.py) under their
+    SHA-256, so identical files are stored once.
+    """
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    sha256: str = Field(index=True)
+    size: int
+    content_type: str
+    filename: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
 class Operation(SQLModel, table=True):
+    __table_args__ = (Index("ix_operation_balance_id_date", "balance_id", "date"),)
+
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     name: str
     description: str
     group: str
-    amount: float
+    amount: float = Field(sa_type=Money)
     type: OperationType
     date: datetime
     invoice: str | None = None
     balance_id: str | None = Field(default=None, foreign_key="balance.id")
+    attachment_id: str | None = Field(
+        default=None, foreign_key="attachment.id", index=True
+    )
 
     balance: Balance | None = Relationship(back_populates="operations")
 
 
+class BalanceMonth(SQLModel, table=True):
+    """Monthly income/expense rollup of a balance, maintained on every write."""
+
+    balance_id: str = Field(foreign_key="balance.id", primary_key=True)
+    month: str = Field(primary_key=True)
+    income: float = Field(default=0, sa_type=Money)
+    expense: float = Field(default=0, sa_type=Money)
+
+
+class ChangeLog(SQLModel, table=True):
+    """
+    Balances and operations written at each association revision.
+
+    Rows only name what changed; clients fetch the current state through
+    `/api/associations/{id}/changes`.
+    """
+
+    __table_args__ = (
+        Index("ix_changelog_association_id_revision", "association_id", "revision"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    association_id: str = Field(foreign_key="association.id")
+    revision: int
+    entity: ChangeEntity
+    entity_id: str
+    deleted: bool = False
+
+
 class BalanceRead(SQLModel):
     id: str
     name: str
     initialAmount: float
+    currentAmount: float = 0
     position: int = 0
     operations: list[Operation] = []
 
@@ -54,10 +157,32 @@ class BalanceRead(SQLModel):
 class AssociationRead(SQLModel):
     id: str
     name: str
+    revision: int = 0
     balances: list[BalanceRead] = []
     operations: list[Operation] = []
 
 
+class BalanceCompactRead(SQLModel):
+    id: str
+    name: str
+    initialAmount: float
+    currentAmount: float = 0
+    position: int = 0
+
+
+class AssociationCompactRead(SQLModel):
+    """Association snapshot where each operation appears exactly once.
+
+    Balances carry no operations; clients group `operations` by `balance_id`.
+    """
+
+    id: str
+    name: str
+    revision: int = 0
+    balances: list[BalanceCompactRead] = []
+    operations: list[Operation] = []
+
+
 def association_to_read(association: Association) -> AssociationRead:
     all_operations = []
     balance_reads = []
@@ -69,6 +194,7 @@ def association_to_read(association: Association) -> AssociationRead:
                 id=balance.id,
                 name=balance.name,
                 initialAmount=balance.initialAmount,
+                currentAmount=balance.currentAmount,
                 position=balance.position,
                 operations=ops,
             )
@@ -77,6 +203,81 @@ def association_to_read(association: Association) -> AssociationRead:
     return AssociationRead(
         id=association.id,
         name=association.name,
+        revision=association.revision,
+        balances=balance_reads,
+        operations=all_operations,
+    )
+
+
+def association_to_compact_read(association: Association) -> AssociationCompactRead:
+    all_operations = []
+    balance_reads = []
+    for balance in association.balances:
+        all_operations.extend(balance.operations)
+        balance_reads.append(
+            BalanceCompactRead(
+                id=balance.id,
+                name=balance.name,
+                initialAmount=balance.initialAmount,
+                currentAmount=balance.currentAmount,
+                position=balance.position,
+            )
+        )
+
+    return AssociationCompactRead(
+        id=association.id,
+        name=association.name,
+        revision=association.revision,
         balances=balance_reads,
         operations=all_operations,
     )
+
+
+class GroupTotal(SQLModel):
+    group: str
+    income: float = 0
+    expense: float = 0
+
+
+class MonthTotal(SQLModel):
+    month: str
+    income: float = 0
+    expense: float = 0
+
+
+class BalanceSummary(SQLModel):
+    balance_id: str
+    name: str
+    initialAmount: float
+    income: float = 0
+    expense: float = 0
+    currentAmount: float
+    groups: list[GroupTotal] = []
+    months: list[MonthTotal] = []
+
+
+class AssociationSummary(SQLModel):
+    association_id: str
+    income: float = 0
+    expense: float = 0
+    currentAmount: float = 0
+    balances: list[BalanceSummary] = []
+    groups: list[GroupTotal] = []
+    months: list[MonthTotal] = []
+
+
+class ChangeSet(SQLModel):
+    """
+    Balances and operations changed after a client's revision.
+
+    Operations of a deleted balance are not listed; clients drop them along
+    with the balance. With `full_resync`, the change log does not reach back
+    to the requested revision and the client must reload the snapshot.
+    """
+
+    revision: int
+    full_resync: bool = False
+    balances: list[BalanceCompactRead] = []
+    operations: list[Operation] = []
+    deleted_balances: list[str] = []
+    deleted_operations: list[str] = []
@@ -0,0 +1,142 @@
+"""
+Minimal streaming PDF writer.
+
+Each page is written out as soon as it is complete, so a document of any
+length needs memory for one page plus one offset per object. Text uses the
+standard Helvetica fonts, which every viewer provides, with WinAnsi encoding;
+characters outside it are replaced.
+"""
+
+PAGE_WIDTH = 595  # A4, in points
+PAGE_HEIGHT = 842
+
+# (resource name, object id, base font)
+FONTS = {
+    False: ("F1", 3, "Helvetica"),
+    True: ("F2", 4, "Helvetica-Bold"),
+}
+_CATALOG_ID = 1
+_PAGES_ID = 2
+_FIRST_FREE_ID = 5
+
+# Helvetica advance widths (1/1000 em) for the characters of formatted
+# amounts; anything else is counted at the width of a digit.
+_WIDTHS = {" ": 278, ",": 278, ".": 278, "-": 333, "+": 584}
+_DEFAULT_WIDTH = 556
+
+
+def text_width(text: str, size: float) -> float:
+    return sum(_WIDTHS.get(char, _DEFAULT_WIDTH) for char in text) * size / 1000
+
+
+def _escape(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class Page:
+    """Content stream of one page, built from text and line drawing operators."""
+
+    def __init__(self):
+        self._operators: list[bytes] = []
+
+    def text(self, x: float, y: float, text: str, size: float = 9, bold=False):
+        font = FONTS[bold][0]
+        self._operators.append(
+            b"BT /%s %g Tf %g %g Td (%s) Tj ET"
+            % (font.encode(), size, x, y, _escape(text))
+        )
+
+    def text_right(self, x: float, y: float, text: str, size: float = 9, bold=False):
+        """Draw text ending at `x`; widths are exact for digits and punctuation."""
+        self.text(x - text_width(text, size), y, text, size, bold)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5):
+        self._operators.append(b"%g w %g %g m %g %g l S" % (width, x1, y1, x2, y2))
+
+    def content(self) -> bytes:
+        return b"\n".join(self._operators)
+
+
+class PdfWriter:
+    """
+    Emit a PDF document as a sequence of byte chunks.
+
+    Call `start()` once, `page()` for every finished page, then `finish()`;
+    each returns the bytes to send next. The page tree and cross-reference
+    table are written last, once every object's offset is known.
+    """
+
+    def __init__(self):
+        self._position = 0
+        self._offsets: dict[int, int] = {}
+        self._page_ids: list[int] = []
+        self._next_id = _FIRST_FREE_ID
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    def _write(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, object_id: int, body: bytes) -> bytes:
+        self._offsets[object_id] = self._position
+        return self._write(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+
+    def start(self) -> bytes:
+        # The binary comment marks the file as 8-bit for transfer tools.
+        chunks = [self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")]
+        for _, object_id, base_font in FONTS.values():
+            chunks.append(
+                self._object(
+                    object_id,
+                    b"<< /Type /Font /Subtype /Type1 /BaseFont /%s "
+                    b"/Encoding /WinAnsiEncoding >>" % base_font.encode(),
+                )
+            )
+        return b"".join(chunks)
+
+    def page(self, page: Page) -> bytes:
+        content = page.content()
+        content_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._page_ids.append(page_id)
+        fonts = b" ".join(
+            b"/%s %d 0 R" % (name.encode(), object_id)
+            for name, object_id, _ in FONTS.values()
+        )
+        return self._object(
+            content_id,
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        ) + self._object(
+            page_id,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << %s >> >> /Contents %d 0 R >>"
+            % (_PAGES_ID, PAGE_WIDTH, PAGE_HEIGHT, fonts, content_id),
+        )
+
+    def finish(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self._page_ids)
+        chunks = [
+            self._object(
+                _PAGES_ID,
+                b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                % (kids, len(self._page_ids)),
+            ),
+            self._object(
+                _CATALOG_ID, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES_ID
+            ),
+        ]
+
+        xref_position = self._position
+        size = self._next_id
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        xref.extend(b"%010d 00000 n \n" % self._offsets[i] for i in range(1, size))
+        xref.append(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, _CATALOG_ID, xref_position)
+        )
+        chunks.append(self._write(b"".join(xref)))
+        return b"".join(chunks)
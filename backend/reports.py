@@ -0,0 +1,257 @@
+"""
+Ledger export formats.
+
+A report receives one balance section at a time and that section's operation
+rows in batches, and returns the bytes to stream for each step. Nothing is
+kept between batches except running totals (and, for PDF, the current page).
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from models import OperationType, to_cents
+from pdf import PAGE_HEIGHT, PAGE_WIDTH, Page, PdfWriter
+
+EXPORT_COLUMNS = (
+    "id",
+    "balance_id",
+    "balance",
+    "date",
+    "name",
+    "description",
+    "group",
+    "type",
+    "amount",
+    "invoice",
+)
+
+
+@dataclass
+class BalanceSection:
+    id: str
+    name: str
+    opening: float
+
+
+def _row_values(section: BalanceSection, row) -> tuple:
+    return (
+        row.id,
+        section.id,
+        section.name,
+        row.date.isoformat(),
+        row.name,
+        row.description,
+        row.group,
+        OperationType(row.type).value,
+        row.amount,
+        row.invoice,
+    )
+
+
+def period_label(start: datetime | None, end: datetime | None) -> str:
+    if start and end:
+        return f"{start:%Y-%m-%d} to {end:%Y-%m-%d} (exclusive)"
+    if start:
+        return f"From {start:%Y-%m-%d}"
+    if end:
+        return f"Before {end:%Y-%m-%d}"
+    return "All operations"
+
+
+class CsvReport:
+    """
+    One row per operation under an EXPORT_COLUMNS header.
+
+    Nothing precedes the header, so CSV tools read the file as a plain table;
+    the title and period only appear in the PDF.
+    """
+
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._section: BalanceSection | None = None
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def start(self) -> bytes:
+        self._writer.writerow(EXPORT_COLUMNS)
+        return self._flush()
+
+    def start_section(self, section: BalanceSection) -> bytes:
+        self._section = section
+        return b""
+
+    def rows(self, rows) -> bytes:
+        self._writer.writerows(_row_values(self._section, row) for row in rows)
+        return self._flush()
+
+    def end_section(self) -> bytes:
+        return b""
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonReport(CsvReport):
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def start(self) -> bytes:
+        return b""
+
+    def rows(self, rows) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, _row_values(self._section, row))))
+            + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _money(cents: int) -> str:
+    return f"{Decimal(cents).scaleb(-2):,.2f}"
+
+
+def _clip(text: str, length: int) -> str:
+    return text if len(text) <= length else text[: length - 3] + "..."
+
+
+class PdfReport:
+    """
+    One page (or more) per balance: its operations with a running amount.
+
+    Totals are kept in integer cents so they stay exact over any number of rows.
+    """
+
+    media_type = "application/pdf"
+    extension = "pdf"
+
+    MARGIN = 40
+    LINE_HEIGHT = 13
+    TABLE_TOP = PAGE_HEIGHT - 110
+    TABLE_BOTTOM = 60
+    # Left edges of the text columns, right edges of the amount columns.
+    DATE_X = MARGIN
+    NAME_X = 100
+    GROUP_X = 300
+    AMOUNT_RIGHT = 470
+    RUNNING_RIGHT = PAGE_WIDTH - MARGIN
+
+    def __init__(self, title: str, period: str):
+        self._title = title
+        self._period = period
+        self._writer = PdfWriter()
+        self._page: Page | None = None
+        self._section: BalanceSection | None = None
+        self._y = self.TABLE_TOP
+        self._running = self._income = self._expense = 0
+
+    def start(self) -> bytes:
+        return self._writer.start()
+
+    def _new_page(self) -> bytes:
+        finished = self._finish_page()
+        page = self._page = Page()
+        top = PAGE_HEIGHT - self.MARGIN
+        page.text(self.MARGIN, top - 14, self._title, size=14, bold=True)
+        page.text(self.MARGIN, top - 32, self._section.name, size=12, bold=True)
+        page.text(self.MARGIN, top - 46, self._period)
+        page.text_right(
+            self.RUNNING_RIGHT, 25, f"Page {self._writer.page_count + 1}", size=8
+        )
+
+        heading = self.TABLE_TOP + 18
+        page.text(self.DATE_X, heading, "Date", bold=True)
+        page.text(self.NAME_X, heading, "Operation", bold=True)
+        page.text(self.GROUP_X, heading, "Group", bold=True)
+        page.text_right(self.AMOUNT_RIGHT, heading, "Amount", bold=True)
+        page.text_right(self.RUNNING_RIGHT, heading, "Balance", bold=True)
+        page.line(self.MARGIN, heading - 5, self.RUNNING_RIGHT, heading - 5)
+        self._y = self.TABLE_TOP
+        return finished
+
+    def _finish_page(self) -> bytes:
+        if self._page is None:
+            return b""
+        page, self._page = self._page, None
+        return self._writer.page(page)
+
+    def _line(self, cells: tuple, bold=False) -> bytes:
+        """Write one table line, starting a new page when the current one is full."""
+        finished = b""
+        if self._y < self.TABLE_BOTTOM:
+            finished = self._new_page()
+        date, name, group, amount, running = cells
+        page, y = self._page, self._y
+        page.text(self.DATE_X, y, date, bold=bold)
+        page.text(self.NAME_X, y, _clip(name, 40), bold=bold)
+        page.text(self.GROUP_X, y, _clip(group, 28), bold=bold)
+        page.text_right(self.AMOUNT_RIGHT, y, amount, bold=bold)
+        page.text_right(self.RUNNING_RIGHT, y, running, bold=bold)
+        self._y -= self.LINE_HEIGHT
+        return finished
+
+    def start_section(self, section: BalanceSection) -> bytes:
+        self._section = section
+        self._running = to_cents(section.opening)
+        self._income = 0
+        self._expense = 0
+        finished = self._new_page()
+        return finished + self._line(
+            ("", "Opening balance", "", "", _money(self._running)), bold=True
+        )
+
+    def rows(self, rows) -> bytes:
+        chunks = []
+        for row in rows:
+            amount = to_cents(row.amount)
+            if OperationType(row.type) == OperationType.INCOME:
+                self._income += amount
+            else:
+                self._expense += amount
+                amount = -amount
+            self._running += amount
+            chunks.append(
+                self._line(
+                    (
+                        f"{row.date:%Y-%m-%d}",
+                        row.name,
+                        row.group,
+                        _money(amount),
+                        _money(self._running),
+                    )
+                )
+            )
+        return b"".join(chunks)
+
+    def end_section(self) -> bytes:
+        self._y -= self.LINE_HEIGHT / 2
+        return b"".join(
+            self._line(cells, bold=True)
+            for cells in (
+                ("", "Income", "", _money(self._income), ""),
+                ("", "Expense", "", _money(-self._expense), ""),
+                ("", "Closing balance", "", "", _money(self._running)),
+            )
+        )
+
+    def finish(self) -> bytes:
+        if self._writer.page_count == 0 and self._page is None:
+            # A document needs at least one page, even with no balances.
+            self._page = Page()
+            self._page.text(self.MARGIN, PAGE_HEIGHT - 54, self._title, 14, True)
+            self._page.text(self.MARGIN, PAGE_HEIGHT - 72, "No balances to export")
+        return self._finish_page() + self._writer.finish()
+
+
+REPORTS = {"csv": CsvReport, "ndjson": NdjsonReport, "pdf": PdfReport}
@@ -0,0 +1,52 @@
+"""
+JSON responses rendered without the standard library encoder.
+
+FastAPI turns an endpoint's return value into plain dicts and lists with
+`jsonable_encoder`, then `JSONResponse` encodes that copy with `json.dumps`.
+For a snapshot of a large ledger, both steps take longer than loading it.
+
+`FastJSONResponse` renders:
+
+- Pydantic models straight to bytes with pydantic-core, with no intermediate
+  dicts. Endpoints get this by returning `model_response(...)` instead of the
+  model, which also skips FastAPI's response model validation.
+- anything else with orjson when it is installed (it is optional), and with
+  the standard library otherwise.
+
+It is the app's default response class, so the second path covers every
+other endpoint.
+"""
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from metrics import SerializationTimer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with SerializationTimer():
+            if isinstance(content, BaseModel):
+                return content.__pydantic_serializer__.to_json(content)
+            if orjson is not None:
+                return orjson.dumps(content)
+            return super().render(content)
+
+
+def model_response(content: BaseModel, response: Response | None = None):
+    """
+    Return a model as the response body, keeping the headers and cookies set
+    on the endpoint's `response` parameter as FastAPI would.
+    """
+    rendered = FastJSONResponse(content)
+    if response is not None:
+        if response.status_code:
+            rendered.status_code = response.status_code
+        rendered.headers.raw.extend(response.headers.raw)
+    return rendered
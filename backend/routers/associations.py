@@ -1,18 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
-from dependencies import get_current_association
-from models import Association, AssociationRead, Balance, association_to_read
+from auth_cache import principal_cache
+from database import SessionFactory, get_session
+from dependencies import (
+    get_current_association,
+    get_read_session,
+    get_read_session_factory,
+)
+from etags import not_modified, snapshot_etag, snapshot_revision
+from ledger import changes_since, delete_association, summarize_association
+from models import (
+    Association,
+    AssociationCompactRead,
+    AssociationRead,
+    AssociationSummary,
+    ChangeSet,
+)
+from responses import model_response
+from snapshots import load_current_snapshot
 
 router = APIRouter(prefix="/api/associations", tags=["associations"])
 
 
-@router.get("/{association_id}", response_model=AssociationRead)
-def get_association(
+@router.get(
+    "/{association_id}", response_model=AssociationRead | AssociationCompactRead
+)
+async def get_association(
     association_id: str,
-    session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
+    compact: bool = False,
+    session: AsyncSession = Depends(get_session),
+    read_session_factory: SessionFactory = Depends(get_read_session_factory),
     current_association: Association = Depends(get_current_association),
 ):
     if current_association.id != association_id:
@@ -20,14 +40,80 @@ def get_association(
             status_code=403, detail="Not authorized to view this association"
         )
 
-    statement = (
-        select(Association)
-        .where(Association.id == association_id)
-        .options(selectinload(Association.balances).selectinload(Balance.operations))
-    )
-    association = session.exec(statement).first()
+    revision = await snapshot_revision(session, association_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Association not found")
+    etag = snapshot_etag(association_id, revision, compact)
+    if cached := not_modified(request, response, etag):
+        return cached
 
-    if not association:
+    snapshot = await load_current_snapshot(
+        read_session_factory, session, association_id, compact, revision
+    )
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Association not found")
+    return model_response(snapshot, response)
+
+
+@router.get("/{association_id}/summary", response_model=AssociationSummary)
+async def get_association_summary(
+    association_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    current_association: Association = Depends(get_current_association),
+):
+    if current_association.id != association_id:
+        raise HTTPException(
+            status_code=403, detail="Not authorized to view this association"
+        )
+
+    return await session.run_sync(summarize_association, association_id)
+
+
+@router.get("/{association_id}/changes", response_model=ChangeSet)
+async def get_association_changes(
+    association_id: str,
+    since: int = Query(ge=0),
+    session: AsyncSession = Depends(get_session),
+    read_session_factory: SessionFactory = Depends(get_read_session_factory),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Balances and operations written after revision `since`.
+
+    Start from the `revision` of a snapshot, then pass each returned
+    `revision` back as `since` on the next call.
+    """
+    if current_association.id != association_id:
+        raise HTTPException(
+            status_code=403, detail="Not authorized to view this association"
+        )
+
+    # A lagging replica would report an older revision, or a full resync for
+    # a `since` it has not reached yet.
+    revision = await snapshot_revision(session, association_id)
+    async with read_session_factory() as read_session:
+        changes = await read_session.run_sync(changes_since, association_id, since)
+    if revision is not None and changes.revision < revision:
+        changes = await session.run_sync(changes_since, association_id, since)
+    return model_response(changes)
+
+
+@router.delete("/{association_id}")
+async def remove_association(
+    association_id: str,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    current_association: Association = Depends(get_current_association),
+):
+    """Delete the association with all its balances and operations, and log out."""
+    if current_association.id != association_id:
+        raise HTTPException(
+            status_code=403, detail="Not authorized to delete this association"
+        )
 
-    return association_to_read(association)
+    await session.run_sync(delete_association, association_id)
+    await session.commit()
+    # Bulk deletes skip the ORM events that normally invalidate the cache.
+    principal_cache.invalidate(association_id)
+    response.delete_cookie("access_token")
+    return {"ok": True}
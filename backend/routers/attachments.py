@@ -0,0 +1,238 @@
+import asyncio
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from attachments import (
+    ATTACHMENT_MAX_BYTES,
+    AttachmentStore,
+    AttachmentTooLarge,
+    get_attachment_store,
+)
+from database import get_session
+from dependencies import get_current_association, get_read_session
+from etags import SNAPSHOT_CACHE_CONTROL, etag_matches
+from ledger import record_changes
+from models import Association, Attachment, Balance, ChangeEntity, Operation
+
+router = APIRouter(prefix="/api/operations", tags=["attachments"])
+
+ATTACHMENT_DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class FileRangeResponse(FileResponse):
+    """`FileResponse` serving bytes `start` to `end` (inclusive) as a 206."""
+
+    def __init__(self, path, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() != "HEAD":
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                remaining = self.end - self.start + 1
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single `Range: bytes=...` header into inclusive offsets.
+
+    Returns None to serve the whole file, as allowed for headers that are
+    malformed or ask for several ranges.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header.removeprefix("bytes=").strip()
+    first, separator, last = spec.partition("-")
+    if not separator or "," in spec:
+        return None
+    try:
+        if first.strip():
+            start = int(first)
+            end = size - 1
+            if last.strip():
+                end = int(last)
+                if end < start:
+                    return None
+        else:
+            # Suffix range: the last N bytes.
+            suffix = int(last)
+            start = max(size - suffix, 0) if suffix > 0 else size
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+async def _owned_operation(
+    session: AsyncSession, operation_id: str, association: Association, action: str
+) -> Operation:
+    operation = await session.get(Operation, operation_id)
+    if not operation:
+        raise HTTPException(status_code=404, detail="Operation not found")
+
+    balance = await session.get(Balance, operation.balance_id)
+    if not balance or balance.association_id != association.id:
+        raise HTTPException(
+            status_code=403, detail=f"Not authorized to {action} this attachment"
+        )
+    return operation
+
+
+async def _attachment(session: AsyncSession, operation: Operation) -> Attachment:
+    attachment = None
+    if operation.attachment_id is not None:
+        attachment = await session.get(Attachment, operation.attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return attachment
+
+
+@router.put("/{operation_id}/attachment", response_model=Attachment)
+async def upload_attachment(
+    operation_id: str,
+    request: Request,
+    filename: str = "attachment",
+    session: AsyncSession = Depends(get_session),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Attach the raw request body to an operation, replacing any previous file.
+
+    The body is streamed to disk and stored once per distinct content; the
+    operation only keeps the attachment's id.
+    """
+    operation = await _owned_operation(
+        session, operation_id, current_association, "update"
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > ATTACHMENT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    # Hand the connection back to the pool while the body streams in.
+    await session.commit()
+    try:
+        sha256, size = await store.save(request.stream(), ATTACHMENT_MAX_BYTES)
+    except AttachmentTooLarge:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    await session.refresh(operation)
+
+    content_type = request.headers.get("content-type")
+    content_type = content_type or ATTACHMENT_DEFAULT_CONTENT_TYPE
+    attachment = Attachment(
+        sha256=sha256, size=size, content_type=content_type, filename=filename
+    )
+    previous = operation.attachment_id
+    session.add(attachment)
+    operation.attachment_id = attachment.id
+    session.add(operation)
+    if previous is not None:
+        # The file itself stays until `cli.py purge-attachments` finds it unused.
+        replaced = await session.get(Attachment, previous)
+        if replaced is not None:
+            await session.delete(replaced)
+    await session.run_sync(
+        record_changes, current_association.id, ChangeEntity.OPERATION, [operation_id]
+    )
+    await session.commit()
+    return attachment
+
+
+@router.get("/{operation_id}/attachment")
+async def download_attachment(
+    operation_id: str,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Download an operation's attachment.
+
+    Supports single `Range` requests (answered with 206) and revalidation
+    with `If-None-Match`: the content hash is the ETag.
+    """
+    operation = await _owned_operation(
+        session, operation_id, current_association, "read"
+    )
+    attachment = await _attachment(session, operation)
+    path = store.path(attachment.sha256)
+    if not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Attachment content is missing")
+
+    etag = f'"{attachment.sha256}"'
+    headers = {"ETag": etag, "Cache-Control": SNAPSHOT_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    headers["Accept-Ranges"] = "bytes"
+
+    byte_range = None
+    # A range is only valid for the version of the file the client asks for.
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = _byte_range(request.headers.get("range"), attachment.size)
+    if byte_range is None:
+        return FileResponse(
+            path,
+            media_type=attachment.content_type,
+            filename=attachment.filename,
+            headers=headers,
+        )
+    start, end = byte_range
+    return FileRangeResponse(
+        path,
+        start,
+        end,
+        attachment.size,
+        media_type=attachment.content_type,
+        filename=attachment.filename,
+        headers=headers,
+    )
+
+
+@router.delete("/{operation_id}/attachment")
+async def delete_attachment(
+    operation_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_association: Association = Depends(get_current_association),
+):
+    operation = await _owned_operation(
+        session, operation_id, current_association, "delete"
+    )
+    attachment = await _attachment(session, operation)
+    operation.attachment_id = None
+    session.add(operation)
+    await session.delete(attachment)
+    await session.run_sync(
+        record_changes, current_association.id, ChangeEntity.OPERATION, [operation_id]
+    )
+    await session.commit()
+    return {"ok": True}
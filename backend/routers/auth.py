@@ -1,28 +1,37 @@
 from datetime import timedelta
+from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
-from dependencies import get_current_association
+from database import ReadRouter, SessionFactory, get_read_router, get_session
+from dependencies import get_current_association, get_read_session_factory
+from etags import not_modified, snapshot_etag, snapshot_revision
 from models import (
     Association,
+    AssociationCompactRead,
     AssociationRead,
     Balance,
-    association_to_read,
+    from_cents,
+    to_cents,
 )
+from responses import model_response
 from security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     get_password_hash,
+    password_needs_rehash,
     verify_password,
 )
+from snapshots import load_current_snapshot, load_snapshot, to_snapshot
 
 
 class BalanceCreate(BaseModel):
     name: str
-    amount: str
+    # Accepts the decimal strings the signup form sends, parsed exactly.
+    amount: Decimal
 
 
 class SignupRequest(BaseModel):
@@ -39,51 +48,76 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     access_token: str
     token_type: str
-    association: AssociationRead
+    association: AssociationRead | AssociationCompactRead
 
 
 router = APIRouter(prefix="/api", tags=["auth"])
 
 
-@router.post("/signup", response_model=AssociationRead)
-def signup(request: SignupRequest, session: Session = Depends(get_session)):
+async def _snapshot(session: AsyncSession, association_id: str, compact: bool):
+    snapshot = await load_snapshot(session, association_id, compact)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Association not found")
+    return snapshot
+
+
+@router.post("/signup", response_model=AssociationRead | AssociationCompactRead)
+async def signup(
+    request: SignupRequest,
+    compact: bool = False,
+    session: AsyncSession = Depends(get_session),
+    read_router: ReadRouter = Depends(get_read_router),
+):
     statement = select(Association).where(Association.name == request.name)
-    existing = session.exec(statement).first()
+    existing = (await session.exec(statement)).first()
     if existing:
         raise HTTPException(status_code=400, detail="Association already exists")
 
-    hashed_password = get_password_hash(request.password)
-    association = Association(name=request.name, password=hashed_password)
+    hashed_password = await get_password_hash(request.password)
+    association = Association(
+        name=request.name,
+        password=hashed_password,
+        balances=[
+            Balance(
+                name=b.name,
+                initialAmount=from_cents(to_cents(b.amount)),
+                position=0,
+                operations=[],
+            )
+            for b in request.balances
+        ],
+    )
     session.add(association)
-    session.commit()
-    session.refresh(association)
-
-    for b in request.balances:
-        balance = Balance(
-            name=b.name,
-            initialAmount=float(b.amount),
-            association_id=association.id,
-            position=0,
-        )
-        session.add(balance)
-
-    session.commit()
-    session.refresh(association)
-    return association_to_read(association)
+    await session.commit()
+    # Replicas may not have the new association yet when its first read comes.
+    read_router.mark_written(association.id)
+    # Everything the snapshot shows was just written, so it is already loaded.
+    return model_response(to_snapshot(association, compact))
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(
-    response: Response, request: LoginRequest, session: Session = Depends(get_session)
+async def login(
+    response: Response,
+    request: LoginRequest,
+    compact: bool = False,
+    session: AsyncSession = Depends(get_session),
 ):
     statement = select(Association).where(Association.name == request.name)
-    association = session.exec(statement).first()
-    if not association or not verify_password(request.password, association.password):
+    association = (await session.exec(statement)).first()
+    if not association or not await verify_password(
+        request.password, association.password
+    ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if password_needs_rehash(association.password):
+        association.password = await get_password_hash(request.password)
+        session.add(association)
+        await session.commit()
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": association.name}, expires_delta=access_token_expires
+        data={"sub": association.name, "aid": association.id},
+        expires_delta=access_token_expires,
     )
 
     response.set_cookie(
@@ -96,19 +130,44 @@ def login(
         secure=False,
     )
 
-    return LoginResponse(
-        access_token=access_token,
-        token_type="bearer",
-        association=association_to_read(association),
+    return model_response(
+        LoginResponse(
+            access_token=access_token,
+            token_type="bearer",
+            association=await _snapshot(session, association.id, compact),
+        ),
+        response,
     )
 
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(response: Response):
     response.delete_cookie("access_token")
     return {"message": "Logged out successfully"}
 
 
-@router.get("/me", response_model=AssociationRead)
-def read_users_me(current_association: Association = Depends(get_current_association)):
-    return association_to_read(current_association)
+@router.get("/me", response_model=AssociationRead | AssociationCompactRead)
+async def read_users_me(
+    request: Request,
+    response: Response,
+    compact: bool = False,
+    session: AsyncSession = Depends(get_session),
+    read_session_factory: SessionFactory = Depends(get_read_session_factory),
+    current_association: Association = Depends(get_current_association),
+):
+    # The revision is read before the snapshot: a write landing in between
+    # yields a newer body under an older tag, which only costs a refetch.
+    association_id = current_association.id
+    revision = await snapshot_revision(session, association_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Association not found")
+    etag = snapshot_etag(association_id, revision, compact)
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    snapshot = await load_current_snapshot(
+        read_session_factory, session, association_id, compact, revision
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Association not found")
+    return model_response(snapshot, response)
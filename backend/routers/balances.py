@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlalchemy import case, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from database import get_session
-from dependencies import get_current_association
-from models import Association, Balance
+from dependencies import get_current_association, get_read_session
+from ledger import delete_balances, record_changes, summarize_balances
+from models import Association, Balance, BalanceSummary, ChangeEntity
 
 router = APIRouter(prefix="/api", tags=["balances"])
 
@@ -21,10 +24,14 @@ class BalanceUpdate(BaseModel):
     position: int
 
 
+class BalanceOrder(BaseModel):
+    balance_ids: list[str]
+
+
 @router.post("/balances_add")
-def add_balance(
+async def add_balance(
     request: BalanceAddRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
     if request.association_id != current_association.id:
@@ -32,13 +39,11 @@ def add_balance(
             status_code=403, detail="Not authorized to add balance to this association"
         )
 
-    statement = (
-        select(Balance)
-        .where(Balance.association_id == request.association_id)
-        .order_by(Balance.position.desc())
+    statement = select(func.max(Balance.position)).where(
+        Balance.association_id == request.association_id
     )
-    last_balance = session.exec(statement).first()
-    new_position = (last_balance.position + 1) if last_balance else 0
+    last_position = (await session.exec(statement)).one()
+    new_position = 0 if last_position is None else last_position + 1
 
     balance = Balance(
         name=request.name,
@@ -47,18 +52,21 @@ def add_balance(
         position=new_position,
     )
     session.add(balance)
-    session.commit()
-    session.refresh(balance)
+    await session.run_sync(
+        record_changes, current_association.id, ChangeEntity.BALANCE, [balance.id]
+    )
+    await session.commit()
+    await session.refresh(balance)
     return balance
 
 
 @router.delete("/balances/{balance_id}")
-def delete_balance(
+async def delete_balance(
     balance_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
-    balance = session.get(Balance, balance_id)
+    balance = await session.get(Balance, balance_id)
     if not balance:
         raise HTTPException(status_code=404, detail="Balance not found")
 
@@ -67,19 +75,74 @@ def delete_balance(
             status_code=403, detail="Not authorized to delete this balance"
         )
 
-    session.delete(balance)
-    session.commit()
+    await session.run_sync(delete_balances, [balance_id])
+    await session.run_sync(
+        record_changes,
+        current_association.id,
+        ChangeEntity.BALANCE,
+        [balance_id],
+        deleted=True,
+    )
+    await session.commit()
+    return {"ok": True}
+
+
+# Declared before /balances/{balance_id}, which would otherwise match "order".
+@router.put("/balances/order")
+async def reorder_balances(
+    data: BalanceOrder,
+    session: AsyncSession = Depends(get_session),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Set every balance's position from its index in `balance_ids`.
+
+    The list must name each of the association's balances exactly once. All
+    positions are rewritten by one UPDATE, so concurrent reorders cannot
+    leave duplicates behind.
+    """
+    ids = data.balance_ids
+    # One indexed query covers both ownership and completeness.
+    statement = select(Balance.id).where(
+        Balance.association_id == current_association.id
+    )
+    owned = set((await session.exec(statement)).all())
+    if not owned.issuperset(ids):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to reorder these balances"
+        )
+    if len(ids) != len(owned) or set(ids) != owned:
+        raise HTTPException(
+            status_code=400, detail="Expected every balance exactly once"
+        )
+
+    if ids:
+        await session.exec(
+            update(Balance)
+            .where(Balance.id.in_(ids))
+            .values(
+                position=case(
+                    {balance_id: index for index, balance_id in enumerate(ids)},
+                    value=Balance.id,
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.run_sync(
+            record_changes, current_association.id, ChangeEntity.BALANCE, ids
+        )
+    await session.commit()
     return {"ok": True}
 
 
 @router.put("/balances/{balance_id}")
-def update_balance(
+async def update_balance(
     balance_id: str,
     data: BalanceUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
-    balance = session.get(Balance, balance_id)
+    balance = await session.get(Balance, balance_id)
     if not balance:
         raise HTTPException(status_code=404, detail="Balance not found")
 
@@ -93,6 +156,27 @@ def update_balance(
     balance.position = data.position
 
     session.add(balance)
-    session.commit()
-    session.refresh(balance)
+    await session.run_sync(
+        record_changes, current_association.id, ChangeEntity.BALANCE, [balance_id]
+    )
+    await session.commit()
+    await session.refresh(balance)
     return balance
+
+
+@router.get("/balances/{balance_id}/summary", response_model=BalanceSummary)
+async def get_balance_summary(
+    balance_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    current_association: Association = Depends(get_current_association),
+):
+    balance = await session.get(Balance, balance_id)
+    if not balance:
+        raise HTTPException(status_code=404, detail="Balance not found")
+
+    if balance.association_id != current_association.id:
+        raise HTTPException(
+            status_code=403, detail="Not authorized to view this balance"
+        )
+
+    return (await session.run_sync(summarize_balances, [balance]))[0]
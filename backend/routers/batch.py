@@ -0,0 +1,302 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Response
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import func
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import get_session
+from dependencies import get_current_association
+from ledger import apply_operation, delete_balances, log_changes, next_revision
+from models import Association, Balance, ChangeEntity, Operation
+from routers.balances import BalanceUpdate
+from routers.operations import OperationCreate, OperationUpdate, _validation_message
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+BATCH_MAX_ITEMS = 1000
+
+
+class BatchBalanceCreate(BaseModel):
+    name: str
+    initialAmount: float
+
+
+class BatchItem(BaseModel):
+    action: Literal["create", "update", "delete"]
+    entity: ChangeEntity
+    # Target of updates and deletes.
+    id: str | None = None
+    # Body of creates and updates, as for the single-item endpoints.
+    data: dict | None = None
+
+
+class BatchRequest(BaseModel):
+    items: list[BatchItem] = Field(max_length=BATCH_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: int
+    id: str | None = None
+    error: str | None = None
+
+
+class BatchResult(BaseModel):
+    committed: bool
+    results: list[BatchItemResult] = []
+
+
+class BatchItemError(Exception):
+    def __init__(self, status: int, error: str):
+        self.status = status
+        self.error = error
+
+
+# Payload model per (entity, action) for the actions that take one.
+PAYLOADS = {
+    (ChangeEntity.OPERATION, "create"): OperationCreate,
+    (ChangeEntity.OPERATION, "update"): OperationUpdate,
+    (ChangeEntity.BALANCE, "create"): BatchBalanceCreate,
+    (ChangeEntity.BALANCE, "update"): BalanceUpdate,
+}
+
+
+class _Batch:
+    """Applies batch items in order against prefetched balances and operations."""
+
+    def __init__(self, session: Session, association_id: str, items: list):
+        self.session = session
+        self.association_id = association_id
+        self.items = items
+        self.payloads: list[BaseModel | None] = []
+        self.balances: dict[str, Balance] = {}
+        self.operations: dict[str, Operation] = {}
+        self.next_position: int | None = None
+        self.changes: list[tuple[ChangeEntity, str, bool]] = []
+
+    def parse(self) -> dict[int, BatchItemResult]:
+        """Validate every payload up front; returns the invalid items by index."""
+        errors = {}
+        for index, item in enumerate(self.items):
+            payload = None
+            model = PAYLOADS.get((item.entity, item.action))
+            try:
+                if item.action != "create" and item.id is None:
+                    raise BatchItemError(422, "id is required")
+                if model is not None:
+                    if item.data is None:
+                        raise BatchItemError(422, "data is required")
+                    payload = model.model_validate(item.data)
+            except ValidationError as exc:
+                errors[index] = BatchItemResult(
+                    index=index, status=422, error=_validation_message(exc)
+                )
+            except BatchItemError as exc:
+                errors[index] = BatchItemResult(
+                    index=index, status=exc.status, error=exc.error
+                )
+            self.payloads.append(payload)
+        return errors
+
+    def prefetch(self):
+        """Load every referenced operation, then every referenced balance."""
+        operation_ids = {
+            item.id for item in self.items if item.entity == ChangeEntity.OPERATION
+        } - {None}
+        if operation_ids:
+            statement = select(Operation).where(Operation.id.in_(operation_ids))
+            self.operations = {op.id: op for op in self.session.exec(statement)}
+
+        balance_ids = {op.balance_id for op in self.operations.values()}
+        balance_ids.update(
+            item.id for item in self.items if item.entity == ChangeEntity.BALANCE
+        )
+        balance_ids.update(
+            payload.balance_id
+            for payload in self.payloads
+            if isinstance(payload, OperationCreate | OperationUpdate)
+        )
+        balance_ids -= {None}
+        if balance_ids:
+            statement = select(Balance).where(Balance.id.in_(balance_ids))
+            self.balances = {
+                balance.id: balance for balance in self.session.exec(statement)
+            }
+
+    def _balance(self, balance_id: str | None, error: str) -> Balance:
+        balance = self.balances.get(balance_id)
+        if balance is None:
+            raise BatchItemError(404, "Balance not found")
+        if balance.association_id != self.association_id:
+            raise BatchItemError(403, error)
+        return balance
+
+    def _operation(self, operation_id: str, error: str) -> Operation:
+        operation = self.operations.get(operation_id)
+        if operation is None:
+            raise BatchItemError(404, "Operation not found")
+        self._balance(operation.balance_id, error)
+        return operation
+
+    def _moved_totals(self, operation: Operation):
+        """Log the operation's balance, whose current amount just changed."""
+        self.changes.append((ChangeEntity.BALANCE, operation.balance_id, False))
+
+    def apply(self, item: BatchItem, payload) -> str:
+        """Apply one item and return the id of the row it wrote."""
+        session = self.session
+        if item.entity == ChangeEntity.OPERATION:
+            if item.action == "create":
+                self._balance(
+                    payload.balance_id,
+                    "Not authorized to add operation to this balance",
+                )
+                operation = Operation(**payload.model_dump())
+                session.add(operation)
+                apply_operation(session, operation)
+                self._moved_totals(operation)
+                self.operations[operation.id] = operation
+                return operation.id
+
+            operation = self._operation(
+                item.id, f"Not authorized to {item.action} this operation"
+            )
+            if item.action == "delete":
+                apply_operation(session, operation, -1)
+                self._moved_totals(operation)
+                session.delete(operation)
+                del self.operations[operation.id]
+                return operation.id
+
+            self._balance(payload.balance_id, "Not authorized to move to this balance")
+            apply_operation(session, operation, -1)
+            self._moved_totals(operation)
+            for field, value in payload.model_dump().items():
+                setattr(operation, field, value)
+            apply_operation(session, operation)
+            self._moved_totals(operation)
+            session.add(operation)
+            return operation.id
+
+        if item.action == "create":
+            if self.next_position is None:
+                statement = select(func.max(Balance.position)).where(
+                    Balance.association_id == self.association_id
+                )
+                last_position = session.exec(statement).one()
+                self.next_position = 0 if last_position is None else last_position + 1
+            balance = Balance(
+                name=payload.name,
+                initialAmount=payload.initialAmount,
+                association_id=self.association_id,
+                position=self.next_position,
+            )
+            self.next_position += 1
+            session.add(balance)
+            self.balances[balance.id] = balance
+            return balance.id
+
+        balance = self._balance(
+            item.id, f"Not authorized to {item.action} this balance"
+        )
+        if item.action == "delete":
+            delete_balances(session, [balance.id])
+            del self.balances[balance.id]
+            # Its operations are gone too; later items see them as missing.
+            self.operations = {
+                op.id: op
+                for op in self.operations.values()
+                if op.balance_id != balance.id
+            }
+            return balance.id
+
+        balance.name = payload.name
+        balance.initialAmount = payload.initialAmount
+        balance.position = payload.position
+        session.add(balance)
+        return balance.id
+
+    def run(self) -> tuple[bool, list[BatchItemResult]]:
+        errors = self.parse()
+        if errors:
+            return False, [
+                errors.get(index)
+                or BatchItemResult(index=index, status=424, error="Not applied")
+                for index in range(len(self.items))
+            ]
+
+        self.prefetch()
+        results = []
+        for index, (item, payload) in enumerate(
+            zip(self.items, self.payloads, strict=True)
+        ):
+            try:
+                entity_id = self.apply(item, payload)
+            except BatchItemError as exc:
+                results.append(
+                    BatchItemResult(index=index, status=exc.status, error=exc.error)
+                )
+                results.extend(
+                    BatchItemResult(
+                        index=later, status=424, error=f"Item {index} failed"
+                    )
+                    for later in range(index + 1, len(self.items))
+                )
+                return False, results
+            self.changes.append((item.entity, entity_id, item.action == "delete"))
+            results.append(BatchItemResult(index=index, status=200, id=entity_id))
+
+        if self.changes:
+            # A row is never written after being deleted, so logging the
+            # writes before the deletes keeps each row's last change last.
+            revision = next_revision(self.session, self.association_id)
+            for deleted in (False, True):
+                for entity in ChangeEntity:
+                    entity_ids = {
+                        entity_id: None
+                        for change, entity_id, is_deleted in self.changes
+                        if change == entity and is_deleted == deleted
+                    }
+                    log_changes(
+                        self.session,
+                        self.association_id,
+                        revision,
+                        entity,
+                        entity_ids,
+                        deleted,
+                    )
+        return True, results
+
+
+def _run_batch(session: Session, association_id: str, items: list[BatchItem]):
+    return _Batch(session, association_id, items).run()
+
+
+@router.post("/batch", response_model=BatchResult)
+async def run_batch(
+    request: BatchRequest,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Apply creates, updates and deletes of operations and balances in order,
+    in a single transaction.
+
+    Every referenced balance and operation is loaded up front with one query
+    each. If any item fails, nothing is committed: the response is a 400 with
+    one result per item, giving the failing items' status and marking the
+    items that were not applied 424.
+    """
+    committed, results = await session.run_sync(
+        _run_batch, current_association.id, request.items
+    )
+    if not committed:
+        await session.rollback()
+        response.status_code = 400
+        return BatchResult(committed=False, results=results)
+
+    await session.commit()
+    return BatchResult(committed=True, results=results)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+from changefeed import event_hub
+from database import get_session_factory
+from dependencies import get_current_association
+from ledger import change_event
+from models import Association
+
+router = APIRouter(prefix="/api", tags=["events"])
+
+# Comment lines keep idle connections open through proxies.
+EVENTS_KEEPALIVE_SECONDS = 15
+EVENTS_RETRY_MILLISECONDS = 3000
+
+
+def format_event(payload: dict) -> str:
+    return (
+        f"id: {payload['revision']}\nevent: change\n"
+        f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+    )
+
+
+async def event_stream(
+    association_id: str,
+    session_factory: async_sessionmaker,
+    last_event_id: int | None = None,
+    keepalive: float = EVENTS_KEEPALIVE_SECONDS,
+) -> AsyncIterator[str]:
+    # Subscribe before reading the revision, so no commit falls in between.
+    queue = event_hub.subscribe(association_id)
+    try:
+        yield f"retry: {EVENTS_RETRY_MILLISECONDS}\n\n"
+
+        if last_event_id is not None:
+            async with session_factory() as session:
+                statement = select(Association.revision).where(
+                    Association.id == association_id
+                )
+                revision = (await session.exec(statement)).first()
+            if revision is not None and revision > last_event_id:
+                # Changes were missed while disconnected; only say how far
+                # to sync.
+                payload = change_event(revision)
+                payload["truncated"] = True
+                yield format_event(payload)
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), keepalive)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(payload)
+    finally:
+        event_hub.unsubscribe(association_id, queue)
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    session_factory: async_sessionmaker = Depends(get_session_factory),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Server-sent events announcing writes to the association's ledger.
+
+    Each `change` event carries the new revision and, unless `truncated`, the
+    balances and operations written; fetch them from
+    `/api/associations/{id}/changes`. Reconnecting browsers send
+    `Last-Event-ID` and get a catch-up event if they missed anything.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    return StreamingResponse(
+        event_stream(
+            current_association.id,
+            session_factory,
+            int(last_event_id) if last_event_id and last_event_id.isdigit() else None,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
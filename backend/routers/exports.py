@@ -0,0 +1,123 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import SessionFactory
+from dependencies import (
+    get_current_association,
+    get_read_session,
+    get_read_session_factory,
+)
+from ledger import amounts_before
+from models import Association, Balance, Operation, from_cents, to_cents
+from reports import REPORTS, BalanceSection, PdfReport, period_label
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+# Rows fetched per round trip from the server-side cursor.
+EXPORT_BATCH_SIZE = 1000
+
+
+def _operations_statement(
+    balance_id: str, start: datetime | None, end: datetime | None
+):
+    statement = (
+        select(
+            Operation.id,
+            Operation.date,
+            Operation.name,
+            Operation.description,
+            Operation.group,
+            Operation.type,
+            Operation.amount,
+            Operation.invoice,
+        )
+        .where(Operation.balance_id == balance_id)
+        .order_by(Operation.date, Operation.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if start is not None:
+        statement = statement.where(Operation.date >= start)
+    if end is not None:
+        statement = statement.where(Operation.date < end)
+    return statement
+
+
+async def _stream_report(
+    report,
+    session_factory: SessionFactory,
+    balances: list[tuple[str, str, float]],
+    start: datetime | None,
+    end: datetime | None,
+) -> AsyncIterator[bytes]:
+    # The request's session is already closed once the body streams, so the
+    # export holds its own connection for as long as the download runs.
+    async with session_factory() as session:
+        yield report.start()
+
+        before = {}
+        if start is not None and balances:
+            before = await session.run_sync(
+                amounts_before, [balance_id for balance_id, _, _ in balances], start
+            )
+
+        for balance_id, name, initial_amount in balances:
+            section = BalanceSection(
+                id=balance_id,
+                name=name,
+                opening=from_cents(
+                    to_cents(initial_amount) + to_cents(before.get(balance_id, 0))
+                ),
+            )
+            yield report.start_section(section)
+            result = await session.stream(_operations_statement(balance_id, start, end))
+            async for rows in result.partitions():
+                yield report.rows(rows)
+            yield report.end_section()
+
+        yield report.finish()
+
+
+@router.get("/operations")
+async def export_operations(
+    export_format: Literal["csv", "ndjson", "pdf"] = Query("csv", alias="format"),
+    balance_id: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    session_factory: SessionFactory = Depends(get_read_session_factory),
+    current_association: Association = Depends(get_current_association),
+):
+    statement = (
+        select(Balance.id, Balance.name, Balance.initialAmount)
+        .where(Balance.association_id == current_association.id)
+        .order_by(Balance.position, Balance.id)
+    )
+    if balance_id is not None:
+        statement = statement.where(Balance.id == balance_id)
+    balances = (await session.exec(statement)).all()
+    if balance_id is not None and not balances:
+        raise HTTPException(status_code=404, detail="Balance not found")
+
+    if export_format == "pdf":
+        report = PdfReport(current_association.name, period_label(start, end))
+    else:
+        report = REPORTS[export_format]()
+    body = (
+        chunk
+        async for chunk in _stream_report(
+            report, session_factory, list(balances), start, end
+        )
+        if chunk
+    )
+    filename = f"operations-{datetime.now():%Y%m%d}.{report.extension}"
+    return StreamingResponse(
+        body,
+        media_type=report.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
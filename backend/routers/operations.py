@@ -1,15 +1,46 @@
+import base64
+import json
+import uuid
+from collections import defaultdict
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlmodel import and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from database import get_session
-from dependencies import get_current_association
-from models import Association, Balance, Operation, OperationType
+from dependencies import get_current_association, get_read_session
+from ingest import (
+    CSV_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    iter_csv_records,
+    iter_ndjson_records,
+)
+from ledger import (
+    apply_delta,
+    apply_operation,
+    log_changes,
+    month_key,
+    next_revision,
+    record_operation_changes,
+)
+from models import (
+    Association,
+    Balance,
+    ChangeEntity,
+    Operation,
+    OperationType,
+    from_cents,
+    to_cents,
+)
 
 router = APIRouter(prefix="/api/operations", tags=["operations"])
 
+BULK_BATCH_SIZE = 500
+BULK_MAX_REPORTED_ERRORS = 1000
+
 
 class OperationCreate(BaseModel):
     name: str
@@ -33,13 +64,116 @@ class OperationUpdate(BaseModel):
     invoice: str | None = None
 
 
+class OperationPage(BaseModel):
+    items: list[Operation]
+    next_cursor: str | None = None
+
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: list[BulkRowError] = []
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _encode_cursor(operation: Operation) -> str:
+    raw = json.dumps([operation.date.isoformat(), operation.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        date, operation_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(date), str(operation_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("", response_model=OperationPage)
+async def list_operations(
+    balance_id: str | None = None,
+    type: OperationType | None = None,
+    group: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    descending: bool = False,
+    session: AsyncSession = Depends(get_read_session),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    List the association's operations one page at a time, ordered by (date, id).
+
+    `start` is inclusive and `end` exclusive. Pass the returned `next_cursor`
+    back as `cursor` to fetch the following page.
+    """
+    statement = (
+        select(Operation)
+        .join(Balance, Operation.balance_id == Balance.id)
+        .where(Balance.association_id == current_association.id)
+    )
+    if balance_id is not None:
+        statement = statement.where(Operation.balance_id == balance_id)
+    if type is not None:
+        statement = statement.where(Operation.type == type)
+    if group is not None:
+        statement = statement.where(Operation.group == group)
+    if start is not None:
+        statement = statement.where(Operation.date >= start)
+    if end is not None:
+        statement = statement.where(Operation.date < end)
+
+    if cursor is not None:
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        if descending:
+            statement = statement.where(
+                or_(
+                    Operation.date < cursor_date,
+                    and_(Operation.date == cursor_date, Operation.id < cursor_id),
+                )
+            )
+        else:
+            statement = statement.where(
+                or_(
+                    Operation.date > cursor_date,
+                    and_(Operation.date == cursor_date, Operation.id > cursor_id),
+                )
+            )
+
+    if descending:
+        statement = statement.order_by(Operation.date.desc(), Operation.id.desc())
+    else:
+        statement = statement.order_by(Operation.date, Operation.id)
+
+    # Fetch one extra row to know whether another page follows.
+    operations = (await session.exec(statement.limit(limit + 1))).all()
+    next_cursor = None
+    if len(operations) > limit:
+        operations = operations[:limit]
+        next_cursor = _encode_cursor(operations[-1])
+
+    return OperationPage(items=operations, next_cursor=next_cursor)
+
+
 @router.post("")
-def create_operation(
+async def create_operation(
     op: OperationCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
-    balance = session.get(Balance, op.balance_id)
+    balance = await session.get(Balance, op.balance_id)
     if not balance:
         raise HTTPException(status_code=404, detail="Balance not found")
 
@@ -59,56 +193,182 @@ def create_operation(
         invoice=op.invoice,
     )
     session.add(operation)
-    session.commit()
-    session.refresh(operation)
+    await session.run_sync(apply_operation, operation)
+    await session.run_sync(
+        record_operation_changes,
+        current_association.id,
+        [operation.id],
+        [operation.balance_id],
+    )
+    await session.commit()
+    await session.refresh(operation)
     return operation
 
 
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_operations(
+    request: Request,
+    atomic: bool = False,
+    session: AsyncSession = Depends(get_session),
+    current_association: Association = Depends(get_current_association),
+):
+    """
+    Import operations from a streamed CSV (with a header row) or NDJSON body.
+
+    Rows are validated and inserted in batches within a single transaction.
+    Rows that fail validation or target a balance the association does not
+    own are skipped and reported by row number (1-based, header excluded).
+    With `atomic`, any failed row rolls back the whole import.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0]
+    content_type = content_type.strip().lower()
+    if content_type in CSV_CONTENT_TYPES:
+        records = iter_csv_records(request.stream())
+    elif content_type in NDJSON_CONTENT_TYPES:
+        records = iter_ndjson_records(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Expected a CSV or NDJSON body")
+
+    result = BulkImportResult()
+    revision = None
+    owned: dict[str, bool] = {}
+    batch: list[tuple[int, OperationCreate]] = []
+    # Rollup deltas per (balance_id, month), applied once at the end.
+    # Kept in cents so that summing thousands of rows stays exact.
+    deltas = defaultdict(lambda: [0, 0])
+
+    def fail(row: int, error: str):
+        result.failed += 1
+        if len(result.errors) < BULK_MAX_REPORTED_ERRORS:
+            result.errors.append(BulkRowError(row=row, error=error))
+
+    async def flush():
+        nonlocal revision
+        unknown = {op.balance_id for _, op in batch} - owned.keys()
+        if unknown:
+            statement = select(Balance.id).where(
+                Balance.id.in_(list(unknown)),
+                Balance.association_id == current_association.id,
+            )
+            found = set((await session.exec(statement)).all())
+            owned.update({balance_id: balance_id in found for balance_id in unknown})
+
+        rows = []
+        for row, op in batch:
+            if not owned[op.balance_id]:
+                fail(row, "Balance not found")
+                continue
+            rows.append({"id": str(uuid.uuid4()), **op.model_dump()})
+            delta = deltas[(op.balance_id, month_key(op.date))]
+            delta[0 if op.type == OperationType.INCOME else 1] += to_cents(op.amount)
+        if rows:
+            await session.exec(insert(Operation), params=rows)
+            result.inserted += len(rows)
+            if revision is None:
+                revision = await session.run_sync(next_revision, current_association.id)
+            await session.run_sync(
+                log_changes,
+                current_association.id,
+                revision,
+                ChangeEntity.OPERATION,
+                [row["id"] for row in rows],
+            )
+        batch.clear()
+
+    async for row, record in records:
+        if isinstance(record, str):
+            fail(row, record)
+            continue
+        if record.get("invoice") == "":
+            record["invoice"] = None
+        try:
+            batch.append((row, OperationCreate.model_validate(record)))
+        except ValidationError as exc:
+            fail(row, _validation_message(exc))
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    await flush()
+
+    if atomic and result.failed:
+        await session.rollback()
+        result.inserted = 0
+        return result
+
+    for (balance_id, month), (income, expense) in deltas.items():
+        await session.run_sync(
+            apply_delta, balance_id, month, from_cents(income), from_cents(expense)
+        )
+    if revision is not None:
+        # The totals of every balance that received rows changed.
+        await session.run_sync(
+            log_changes,
+            current_association.id,
+            revision,
+            ChangeEntity.BALANCE,
+            dict.fromkeys(balance_id for balance_id, _ in deltas),
+        )
+    await session.commit()
+    return result
+
+
 @router.delete("/{operation_id}")
-def delete_operation(
+async def delete_operation(
     operation_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
-    operation = session.get(Operation, operation_id)
+    operation = await session.get(Operation, operation_id)
     if not operation:
         raise HTTPException(status_code=404, detail="Operation not found")
 
-    balance = session.get(Balance, operation.balance_id)
+    balance = await session.get(Balance, operation.balance_id)
     if not balance or balance.association_id != current_association.id:
         raise HTTPException(
             status_code=403, detail="Not authorized to delete this operation"
         )
 
-    session.delete(operation)
-    session.commit()
+    await session.run_sync(apply_operation, operation, -1)
+    await session.delete(operation)
+    await session.run_sync(
+        record_operation_changes,
+        current_association.id,
+        [operation_id],
+        [operation.balance_id],
+        deleted=True,
+    )
+    await session.commit()
     return {"ok": True}
 
 
 @router.put("/{operation_id}")
-def update_operation(
+async def update_operation(
     operation_id: str,
     op: OperationUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_association: Association = Depends(get_current_association),
 ):
-    operation = session.get(Operation, operation_id)
+    operation = await session.get(Operation, operation_id)
     if not operation:
         raise HTTPException(status_code=404, detail="Operation not found")
 
-    balance = session.get(Balance, operation.balance_id)
+    balance = await session.get(Balance, operation.balance_id)
     if not balance or balance.association_id != current_association.id:
         raise HTTPException(
             status_code=403, detail="Not authorized to update this operation"
         )
 
     if op.balance_id != operation.balance_id:
-        new_balance = session.get(Balance, op.balance_id)
+        new_balance = await session.get(Balance, op.balance_id)
         if not new_balance or new_balance.association_id != current_association.id:
             raise HTTPException(
                 status_code=403, detail="Not authorized to move to this balance"
             )
 
+    # Take the old values out of the rollups and put the new ones back in; this
+    # also covers moves between balances and changes of month or type.
+    old_balance_id = operation.balance_id
+    await session.run_sync(apply_operation, operation, -1)
     operation.name = op.name
     operation.description = op.description
     operation.group = op.group
@@ -117,8 +377,15 @@ def update_operation(
     operation.date = op.date
     operation.balance_id = op.balance_id
     operation.invoice = op.invoice
+    await session.run_sync(apply_operation, operation)
 
     session.add(operation)
-    session.commit()
-    session.refresh(operation)
+    await session.run_sync(
+        record_operation_changes,
+        current_association.id,
+        [operation_id],
+        [old_balance_id, operation.balance_id],
+    )
+    await session.commit()
+    await session.refresh(operation)
     return operation
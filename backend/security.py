@@ -1,4 +1,8 @@
+import asyncio
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import UTC, datetime, timedelta
 
 import bcrypt
@@ -8,22 +12,126 @@ SECRET_KEY = os.getenv("SECRET_KEY", "default_insecure_key_for_dev_only")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 4))
+)
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool cannot take another job."""
+
+
+def _checkpw(password_bytes: bytes, hashed_bytes: bytes) -> bool:
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+def _hashpw(password_bytes: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated, size-limited process pool.
+
+    At most `max_pending` jobs may be queued or running; beyond that callers
+    get PasswordHasherBusy immediately instead of waiting in line. With
+    `workers=0`, bcrypt runs in a thread of the event loop's default executor.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool inherited across fork() is unusable; start a fresh one.
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        """
+        Start a job whose slot is freed once it has finished or been cancelled.
+
+        A caller that stops waiting (on timeout or disconnect) must not free
+        the slot while bcrypt still occupies a worker.
+        """
+
+        def release(_):
+            self._slots.release()
+
+        if self.workers == 0:
+            future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+            future.add_done_callback(release)
+            # A running thread cannot be stopped, but cancelling its future
+            # would mark it done at once; only the shield is cancelled.
+            return asyncio.shield(future)
+
+        job = self._get_executor().submit(fn, *args)
+        # Runs when the worker returns, or at once if a queued job is cancelled.
+        job.add_done_callback(release)
+        return asyncio.wrap_future(job)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT_SECONDS
+)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password using bcrypt."""
     password_bytes = plain_password.encode("utf-8")[:72]
     hashed_bytes = hashed_password.encode("utf-8")
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    return await password_hasher.run(_checkpw, password_bytes, hashed_bytes)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
     password_bytes = password.encode("utf-8")[:72]
-    salt = bcrypt.gensalt(rounds=12)
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    hashed = await password_hasher.run(_hashpw, password_bytes, BCRYPT_ROUNDS)
     return hashed.decode("utf-8")
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a bcrypt hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,72 @@
+"""
+Association snapshots, as returned by `/api/me`, `/api/login`, `/api/signup`
+and `/api/associations/{id}`.
+
+Async sessions cannot lazy-load relationships, and walking them one balance
+at a time would cost a query per balance anyway. Snapshots are read with a
+fixed number of statements instead: the association, then its balances and
+their operations through `selectinload`.
+"""
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import SessionFactory
+from models import (
+    Association,
+    AssociationCompactRead,
+    AssociationRead,
+    Balance,
+    association_to_compact_read,
+    association_to_read,
+)
+
+
+def snapshot_statement(association_id: str):
+    return (
+        select(Association)
+        .where(Association.id == association_id)
+        .options(selectinload(Association.balances).selectinload(Balance.operations))
+        # The association may already be in the session (e.g. the cached
+        # principal) with its relationships unloaded.
+        .execution_options(populate_existing=True)
+    )
+
+
+def to_snapshot(
+    association: Association, compact: bool
+) -> AssociationRead | AssociationCompactRead:
+    """Build the snapshot of an association whose relationships are loaded."""
+    if compact:
+        return association_to_compact_read(association)
+    return association_to_read(association)
+
+
+async def load_snapshot(
+    session: AsyncSession, association_id: str, compact: bool
+) -> AssociationRead | AssociationCompactRead | None:
+    """Read an association's snapshot, or None if it does not exist."""
+    statement = snapshot_statement(association_id)
+    association = (await session.exec(statement)).first()
+    if association is None:
+        return None
+    return to_snapshot(association, compact)
+
+
+async def load_current_snapshot(
+    read_session_factory: SessionFactory,
+    session: AsyncSession,
+    association_id: str,
+    compact: bool,
+    revision: int,
+) -> AssociationRead | AssociationCompactRead | None:
+    """
+    Read a snapshot at `revision` or later, from a read replica when it has
+    caught up with that revision and from the primary `session` otherwise.
+    """
+    async with read_session_factory() as read_session:
+        snapshot = await load_snapshot(read_session, association_id, compact)
+    if snapshot is None or snapshot.revision < revision:
+        snapshot = await load_snapshot(session, association_id, compact)
+    return snapshot
@@ -1,35 +1,140 @@
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
+from attachments import AttachmentStore, get_attachment_store
+from auth_cache import principal_cache
+from database import get_session_factory
 from main import app
 
-# Use in-memory SQLite for tests
-sqlite_file_name = "database.db"
-sqlite_url = "sqlite://"
 
-engine = create_engine(
-    sqlite_url, connect_args={"check_same_thread": False}, poolclass=StaticPool
-)
+# Use a per-test SQLite file so the API's async engine and the tests' sync
+# session see the same data.
+@pytest.fixture(name="database_path")
+def database_path_fixture(tmp_path):
+    return tmp_path / "test.db"
 
 
-@pytest.fixture(name="session")
-def session_fixture():
+@pytest.fixture(name="engine")
+def engine_fixture(database_path):
+    engine = create_engine(
+        f"sqlite:///{database_path}", connect_args={"check_same_thread": False}
+    )
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
     SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
     with Session(engine) as session:
         yield session
-    SQLModel.metadata.drop_all(engine)
 
 
-@pytest.fixture(name="client")
-def client_fixture(session: Session):
-    def get_session_override():
-        return session
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(engine, database_path):
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool
+    )
+
+
+@pytest.fixture(name="sql_statements")
+def sql_statements_fixture(async_engine):
+    """
+    Collect the SQL statements the API runs within a block:
+
+        with sql_statements() as statements:
+            client.get("/api/me")
+    """
+
+    @contextmanager
+    def capture():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    return capture
+
 
-    app.dependency_overrides[get_session] = get_session_override
+@pytest.fixture(name="attachment_store")
+def attachment_store_fixture(tmp_path):
+    return AttachmentStore(tmp_path / "attachments")
 
-    client = TestClient(app)
-    yield client
+
+@pytest.fixture(name="client")
+def client_fixture(async_engine, attachment_store):
+    session_factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_attachment_store] = lambda: attachment_store
+    principal_cache.clear()
+
+    with TestClient(app) as client:
+        yield client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="operation_payload")
+def operation_payload_fixture():
+    """Build an operation body for a balance; keywords override the defaults."""
+
+    def build(balance_id: str, **overrides) -> dict:
+        return {
+            "name": "Op",
+            "description": "",
+            "group": "misc",
+            "amount": 10.0,
+            "type": "expense",
+            "date": "2024-01-15T00:00:00",
+            "balance_id": balance_id,
+            **overrides,
+        }
+
+    return build
+
+
+@pytest.fixture(name="add_operation")
+def add_operation_fixture(client: TestClient, operation_payload):
+    """Create an operation through the API and return it."""
+
+    def add(balance_id: str, **overrides) -> dict:
+        payload = operation_payload(balance_id, **overrides)
+        response = client.post("/api/operations", json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return add
+
+
+@pytest.fixture(name="association")
+def association_fixture(client: TestClient):
+    """Sign up and log in an association with two balances; returns /api/me."""
+    client.post(
+        "/api/signup",
+        json={
+            "name": "FixtureAsso",
+            "password": "password123",
+            "balances": [
+                {"name": "Main", "amount": "100.0"},
+                {"name": "Cash", "amount": "20.0"},
+            ],
+        },
+    )
+    client.post("/api/login", json={"name": "FixtureAsso", "password": "password123"})
+    return client.get("/api/me").json()
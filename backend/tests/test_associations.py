@@ -0,0 +1,162 @@
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from models import Association, Balance, ChangeLog, Operation
+
+
+def test_get_association_full_snapshot(client: TestClient, association, add_operation):
+    add_operation(association["balances"][0]["id"])
+
+    data = client.get(f"/api/associations/{association['id']}").json()
+    assert len(data["operations"]) == 1
+    assert len(data["balances"][0]["operations"]) == 1
+
+
+def test_compact_snapshot_lists_each_operation_once(
+    client: TestClient, association, add_operation
+):
+    add_operation(association["balances"][0]["id"])
+    add_operation(association["balances"][1]["id"])
+
+    for url in (f"/api/associations/{association['id']}", "/api/me"):
+        data = client.get(url, params={"compact": True}).json()
+        assert len(data["operations"]) == 2
+        assert all("operations" not in balance for balance in data["balances"])
+
+
+def test_snapshot_etag_answers_304_until_a_write(
+    client: TestClient, association, sql_statements, add_operation
+):
+    url = f"/api/associations/{association['id']}"
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert client.get("/api/me").headers["etag"] == etag
+    assert client.get(url, params={"compact": True}).headers["etag"] != etag
+
+    with sql_statements() as statements:
+        unchanged = client.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert not unchanged.content
+    assert not any("FROM operation" in statement for statement in statements)
+
+    add_operation(association["balances"][0]["id"])
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["operations"]) == 1
+
+
+def test_changes_since_revision(client: TestClient, association, add_operation):
+    url = f"/api/associations/{association['id']}/changes"
+    main_id = association["balances"][0]["id"]
+    since = association["revision"]
+    assert client.get(url, params={"since": since}).json()["revision"] == since
+
+    add_operation(main_id)
+    add_operation(main_id)
+    changes = client.get(url, params={"since": since}).json()
+    assert not changes["full_resync"]
+    assert len(changes["operations"]) == 2
+    # The running amount moved with the operations.
+    assert [
+        (balance["id"], balance["currentAmount"]) for balance in changes["balances"]
+    ] == [(main_id, 80.0)]
+
+    since = changes["revision"]
+    deleted = changes["operations"][0]["id"]
+    client.delete(f"/api/operations/{deleted}")
+    client.put(
+        f"/api/balances/{main_id}",
+        json={"name": "Renamed", "initialAmount": 100.0, "position": 0},
+    )
+    changes = client.get(url, params={"since": since}).json()
+    assert changes["deleted_operations"] == [deleted]
+    assert changes["operations"] == []
+    assert [
+        (balance["name"], balance["currentAmount"]) for balance in changes["balances"]
+    ] == [("Renamed", 90.0)]
+
+    since = changes["revision"]
+    cash_id = association["balances"][1]["id"]
+    kept = next(
+        operation
+        for operation in client.get("/api/me").json()["operations"]
+        if operation["id"] != deleted
+    )
+    response = client.put(
+        f"/api/operations/{kept['id']}", json={**kept, "balance_id": cash_id}
+    )
+    assert response.status_code == 200
+    changes = client.get(url, params={"since": since}).json()
+    assert {
+        balance["id"]: balance["currentAmount"] for balance in changes["balances"]
+    } == {main_id: 100.0, cash_id: 10.0}
+
+    assert client.get(url, params={"since": 10_000}).json()["full_resync"]
+
+
+def test_delete_association(client: TestClient, association, session, add_operation):
+    balance_id = association["balances"][0]["id"]
+    add_operation(balance_id)
+    other = client.post(
+        "/api/signup",
+        json={"name": "Other", "password": "password123", "balances": []},
+    ).json()
+
+    assert client.delete(f"/api/associations/{other['id']}").status_code == 403
+    response = client.delete(f"/api/associations/{association['id']}")
+    assert response.status_code == 200
+    assert client.get("/api/me").status_code == 401
+
+    assert session.get(Association, association["id"]) is None
+    assert session.get(Association, other["id"]) is not None
+    for model in (Balance, Operation, ChangeLog):
+        assert session.exec(select(model)).all() == []
+
+
+def _signup(client: TestClient, name: str, balances: int):
+    response = client.post(
+        "/api/signup",
+        json={
+            "name": name,
+            "password": "password123",
+            "balances": [
+                {"name": f"Balance {index}", "amount": "10.00"}
+                for index in range(balances)
+            ],
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_snapshot_query_count_does_not_grow_with_balances(
+    client: TestClient, sql_statements, add_operation
+):
+    counts = {}
+    for balances in (1, 12):
+        name = f"Asso{balances}"
+        with sql_statements() as signup:
+            association = _signup(client, name, balances)
+        assert len(association["balances"]) == balances
+        client.post("/api/login", json={"name": name, "password": "password123"})
+        for balance in association["balances"]:
+            add_operation(balance["id"])
+
+        with sql_statements() as login:
+            client.post("/api/login", json={"name": name, "password": "password123"})
+        client.get("/api/me")
+        with sql_statements() as me:
+            snapshot = client.get("/api/me").json()
+        assert len(snapshot["operations"]) == balances
+        with sql_statements() as association_read:
+            client.get(f"/api/associations/{association['id']}")
+        counts[balances] = [
+            len(statements) for statements in (signup, login, me, association_read)
+        ]
+
+    assert counts[1] == counts[12]
+    # Snapshot reads: the revision, then association, balances, operations.
+    assert counts[1][2] == 4
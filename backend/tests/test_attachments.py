@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+import routers.attachments
+from attachments import purge_attachments
+from models import Attachment
+
+INVOICE = b"%PDF-1.4 invoice 2024-001"
+
+
+def _upload(client: TestClient, operation_id: str, content: bytes = INVOICE):
+    return client.put(
+        f"/api/operations/{operation_id}/attachment",
+        params={"filename": "facture 001.pdf"},
+        content=content,
+        headers={"Content-Type": "application/pdf"},
+    )
+
+
+def test_upload_and_download(
+    client: TestClient, association, attachment_store, add_operation
+):
+    balance_id = association["balances"][0]["id"]
+    first = add_operation(balance_id)
+    second = add_operation(balance_id)
+
+    response = _upload(client, first["id"])
+    assert response.status_code == 200
+    attachment = response.json()
+    assert attachment["size"] == len(INVOICE)
+    assert _upload(client, second["id"]).json()["sha256"] == attachment["sha256"]
+    # Identical content is stored once.
+    assert [sha256 for sha256, _ in attachment_store.blobs()] == [attachment["sha256"]]
+
+    snapshot = client.get("/api/me").json()
+    operation = next(op for op in snapshot["operations"] if op["id"] == first["id"])
+    assert operation["attachment_id"] == attachment["id"]
+    assert snapshot["revision"] == association["revision"] + 4
+
+    response = client.get(f"/api/operations/{first['id']}/attachment")
+    assert response.status_code == 200
+    assert response.content == INVOICE
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert (
+        "filename*=utf-8''facture%20001.pdf"
+        in (response.headers["content-disposition"])
+    )
+
+    response = client.get(
+        f"/api/operations/{first['id']}/attachment",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_range_requests(client: TestClient, association, add_operation):
+    operation = add_operation(association["balances"][0]["id"])
+    _upload(client, operation["id"])
+    url = f"/api/operations/{operation['id']}/attachment"
+
+    response = client.get(url, headers={"Range": "bytes=5-11"})
+    assert response.status_code == 206
+    assert response.content == INVOICE[5:12]
+    assert response.headers["content-range"] == f"bytes 5-11/{len(INVOICE)}"
+
+    response = client.get(url, headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.content == INVOICE[-4:]
+
+    response = client.get(url, headers={"Range": f"bytes={len(INVOICE)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(INVOICE)}"
+
+    # A range for another version of the file gets the whole current one.
+    response = client.get(url, headers={"Range": "bytes=0-3", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == INVOICE
+
+
+def test_attachment_limits_and_ownership(
+    client: TestClient, association, monkeypatch, add_operation
+):
+    operation = add_operation(association["balances"][0]["id"])
+    monkeypatch.setattr(routers.attachments, "ATTACHMENT_MAX_BYTES", 8)
+    assert _upload(client, operation["id"]).status_code == 413
+
+    client.post(
+        "/api/signup",
+        json={"name": "Other", "password": "password123", "balances": []},
+    )
+    client.post("/api/login", json={"name": "Other", "password": "password123"})
+    url = f"/api/operations/{operation['id']}/attachment"
+    assert client.get(url).status_code == 403
+    assert client.delete(url).status_code == 403
+
+
+def test_purge_unused_attachments(
+    client: TestClient, association, attachment_store, session, add_operation
+):
+    operation = add_operation(association["balances"][0]["id"])
+    kept = _upload(client, operation["id"], b"kept").json()
+    replaced = _upload(client, operation["id"], b"replaced").json()
+    url = f"/api/operations/{operation['id']}/attachment"
+    assert client.get(url).content == b"replaced"
+
+    assert client.delete(url).status_code == 200
+    assert client.get(url).status_code == 404
+    assert len(list(attachment_store.blobs())) == 2
+
+    assert purge_attachments(session, attachment_store, timedelta(hours=1)) == (0, 0)
+    assert purge_attachments(session, attachment_store, timedelta(0)) == (0, 2)
+    assert not list(attachment_store.blobs())
+    assert session.get(Attachment, kept["id"]) is None
+    assert session.get(Attachment, replaced["id"]) is None
@@ -1,5 +1,12 @@
+import asyncio
+import threading
+
+import pytest
 from fastapi.testclient import TestClient
 
+import security
+from models import Association
+
 
 def test_signup(client: TestClient):
     response = client.post(
@@ -36,3 +43,80 @@ def test_login(client: TestClient):
 
     # Check cookie
     assert "access_token" in response.cookies
+
+
+def test_principal_cache_skips_lookup_and_invalidates(
+    client: TestClient, session, association
+):
+    before = client.get("/health/auth-cache").json()
+    client.get("/api/me")
+    client.get("/api/me")
+    after = client.get("/health/auth-cache").json()
+    assert after["hits"] - before["hits"] == 2
+
+    stored = session.get(Association, association["id"])
+    stored.password = "changed"
+    session.add(stored)
+    session.commit()
+    assert client.get("/health/auth-cache").json()["size"] == 0
+
+    response = client.get("/api/me")
+    assert response.status_code == 200
+    assert client.get("/health/auth-cache").json()["size"] == 1
+
+
+def test_cached_principal_rejects_a_token_for_another_association(
+    client: TestClient, association
+):
+    assert client.get("/api/me").status_code == 200
+    assert client.get("/health/auth-cache").json()["size"] == 1
+
+    token = security.create_access_token({"sub": "FixtureAsso", "aid": "other-id"})
+    client.cookies.clear()
+    response = client.get("/api/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_login_returns_429_when_hashing_pool_is_saturated(
+    client: TestClient, association, monkeypatch
+):
+    monkeypatch.setattr(
+        security, "password_hasher", security.PasswordHasher(0, 0, timeout=1)
+    )
+    response = client.post(
+        "/api/login", json={"name": "FixtureAsso", "password": "password123"}
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes():
+    hasher = security.PasswordHasher(0, 1, timeout=0.05)
+    finished = threading.Event()
+
+    async def scenario():
+        with pytest.raises(security.PasswordHasherBusy):
+            await hasher.run(finished.wait)
+        # The first job still runs in its thread and holds the only slot.
+        with pytest.raises(security.PasswordHasherBusy):
+            await hasher.run(lambda: True)
+        finished.set()
+        await asyncio.sleep(0.1)
+        assert await hasher.run(lambda: True)
+
+    asyncio.run(scenario())
+
+
+def test_login_rehashes_when_cost_changes(
+    client: TestClient, session, association, monkeypatch
+):
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", 4)
+    response = client.post(
+        "/api/login", json={"name": "FixtureAsso", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+    stored = session.get(Association, association["id"])
+    session.refresh(stored)
+    assert stored.password.startswith("$2b$04$")
+    assert not security.password_needs_rehash(stored.password)
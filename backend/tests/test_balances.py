@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from ledger import purge_orphans, rebuild_rollups
+from models import Balance, BalanceMonth, ChangeEntity, ChangeLog, Operation
+
+
+def test_balance_summary(client: TestClient, association, add_operation):
+    balance_id = association["balances"][0]["id"]
+    add_operation(balance_id, type="income", amount=50.0, group="dons")
+    add_operation(balance_id, amount=30.0)
+    add_operation(balance_id, amount=5.0, date="2024-02-01T00:00:00")
+
+    summary = client.get(f"/api/balances/{balance_id}/summary").json()
+    assert summary["income"] == 50.0
+    assert summary["expense"] == 35.0
+    assert summary["currentAmount"] == 115.0
+    assert summary["groups"] == [
+        {"group": "dons", "income": 50.0, "expense": 0.0},
+        {"group": "misc", "income": 0.0, "expense": 35.0},
+    ]
+    assert [month["month"] for month in summary["months"]] == ["2024-01", "2024-02"]
+
+
+def test_association_summary(client: TestClient, association, add_operation):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    add_operation(main_id, amount=40.0)
+    add_operation(cash_id, type="income", amount=15.0)
+
+    summary = client.get(f"/api/associations/{association['id']}/summary").json()
+    assert summary["currentAmount"] == 100.0 - 40.0 + 20.0 + 15.0
+    assert {balance["balance_id"] for balance in summary["balances"]} == {
+        main_id,
+        cash_id,
+    }
+    assert summary["months"] == [{"month": "2024-01", "income": 15.0, "expense": 40.0}]
+
+
+def _current_amounts(client: TestClient, association_id: str) -> dict:
+    data = client.get(f"/api/associations/{association_id}").json()
+    return {balance["id"]: balance["currentAmount"] for balance in data["balances"]}
+
+
+def test_running_totals_follow_writes(client: TestClient, association, add_operation):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    operation = add_operation(main_id, amount=30.0)
+    assert _current_amounts(client, association["id"]) == {main_id: 70.0, cash_id: 20.0}
+
+    moved = dict(operation, balance_id=cash_id, type="income", amount=5.0)
+    client.put(f"/api/operations/{operation['id']}", json=moved)
+    assert _current_amounts(client, association["id"]) == {
+        main_id: 100.0,
+        cash_id: 25.0,
+    }
+
+    client.delete(f"/api/operations/{operation['id']}")
+    assert _current_amounts(client, association["id"]) == {
+        main_id: 100.0,
+        cash_id: 20.0,
+    }
+    summary = client.get(f"/api/balances/{cash_id}/summary").json()
+    assert summary["months"] == []
+
+
+def test_rebuild_rollups_repairs_drift(
+    client: TestClient, session, association, add_operation
+):
+    balance_id = association["balances"][0]["id"]
+    add_operation(balance_id, amount=30.0)
+
+    balance = session.get(Balance, balance_id)
+    balance.expenseTotal = 999.0
+    session.add(balance)
+    session.commit()
+
+    assert rebuild_rollups(session, verify_only=True)
+    rebuild_rollups(session)
+    session.commit()
+    assert rebuild_rollups(session, verify_only=True) == []
+    assert session.get(Balance, balance_id).currentAmount == 70.0
+
+
+def test_reorder_balances(client: TestClient, association):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    added = client.post(
+        "/api/balances_add",
+        json={"name": "Bank", "initialAmount": 0, "association_id": association["id"]},
+    ).json()
+    assert added["position"] == 1
+
+    order = [added["id"], cash_id, main_id]
+    response = client.put("/api/balances/order", json={"balance_ids": order})
+    assert response.status_code == 200
+    data = client.get("/api/me").json()
+    positions = {balance["id"]: balance["position"] for balance in data["balances"]}
+    assert positions == {added["id"]: 0, cash_id: 1, main_id: 2}
+
+    incomplete = client.put("/api/balances/order", json={"balance_ids": order[:2]})
+    assert incomplete.status_code == 400
+    duplicated = client.put(
+        "/api/balances/order", json={"balance_ids": [main_id, *order]}
+    )
+    assert duplicated.status_code == 400
+    foreign = client.put("/api/balances/order", json={"balance_ids": [*order, "other"]})
+    assert foreign.status_code == 403
+
+
+def test_amounts_are_exact_cents(
+    client: TestClient, association, session, add_operation
+):
+    main_id = association["balances"][0]["id"]
+    for amount in (0.1, 0.2, 0.005):
+        add_operation(main_id, type="income", amount=amount)
+
+    summary = client.get(f"/api/balances/{main_id}/summary").json()
+    # 0.005 rounds half away from zero to one cent.
+    assert summary["income"] == 0.31
+    assert summary["currentAmount"] == 100.31
+    assert summary["groups"] == [{"group": "misc", "income": 0.31, "expense": 0.0}]
+
+    stored = session.connection().exec_driver_sql("SELECT SUM(amount) FROM operation")
+    assert stored.scalar() == 31
+
+
+def test_delete_balance_removes_its_operations(
+    client: TestClient, association, session, add_operation
+):
+    main_id, cash_id = (balance["id"] for balance in association["balances"])
+    add_operation(main_id)
+    add_operation(main_id, date="2024-02-01T00:00:00")
+    kept = add_operation(cash_id)
+
+    assert client.delete(f"/api/balances/{main_id}").status_code == 200
+    assert session.exec(select(Operation.id)).all() == [kept["id"]]
+    assert {row.balance_id for row in session.exec(select(BalanceMonth))} == {cash_id}
+
+
+def test_purge_orphans(session):
+    session.add(Balance(id="stray", name="Stray", initialAmount=0, association_id="x"))
+    for balance_id in ("stray", "gone", None):
+        session.add(
+            Operation(
+                name="Op",
+                description="",
+                group="misc",
+                amount=1.0,
+                type="income",
+                date=datetime(2024, 1, 1),
+                balance_id=balance_id,
+            )
+        )
+    session.add(BalanceMonth(balance_id="gone", month="2024-01", income=1.0))
+    session.add(
+        ChangeLog(
+            association_id="x", revision=1, entity=ChangeEntity.BALANCE, entity_id="a"
+        )
+    )
+    session.commit()
+
+    assert purge_orphans(session, batch_size=1) == {
+        "balance": 1,
+        "operation": 2,
+        "balancemonth": 1,
+        "changelog": 1,
+    }
+    assert session.exec(select(Operation)).all() == []
+    assert purge_orphans(session)["operation"] == 0
@@ -0,0 +1,104 @@
+from fastapi.testclient import TestClient
+
+
+def _current_amounts(client: TestClient) -> dict:
+    data = client.get("/api/me").json()
+    return {balance["name"]: balance["currentAmount"] for balance in data["balances"]}
+
+
+def test_batch_applies_items_in_one_transaction(
+    client: TestClient, association, operation_payload
+):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    response = client.post(
+        "/api/batch",
+        json={
+            "items": [
+                {
+                    "action": "create",
+                    "entity": "operation",
+                    "data": operation_payload(main_id),
+                },
+                {
+                    "action": "create",
+                    "entity": "operation",
+                    "data": operation_payload(cash_id, type="income", amount=5.0),
+                },
+                {
+                    "action": "create",
+                    "entity": "balance",
+                    "data": {"name": "Bank", "initialAmount": 50.0},
+                },
+            ]
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"]
+    assert [result["status"] for result in body["results"]] == [200, 200, 200]
+    first, second, bank = (result["id"] for result in body["results"])
+    assert _current_amounts(client) == {"Main": 90.0, "Cash": 25.0, "Bank": 50.0}
+
+    response = client.post(
+        "/api/batch",
+        json={
+            "items": [
+                {
+                    "action": "update",
+                    "entity": "operation",
+                    "id": first,
+                    "data": operation_payload(bank, amount=20.0),
+                },
+                {"action": "delete", "entity": "operation", "id": second},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert _current_amounts(client) == {"Main": 100.0, "Cash": 20.0, "Bank": 30.0}
+
+    changes = client.get(
+        f"/api/associations/{association['id']}/changes",
+        params={"since": association["revision"]},
+    ).json()
+    assert changes["revision"] == association["revision"] + 2
+    assert changes["deleted_operations"] == [second]
+
+
+def test_batch_is_all_or_nothing(client: TestClient, association, operation_payload):
+    main_id = association["balances"][0]["id"]
+    response = client.post(
+        "/api/batch",
+        json={
+            "items": [
+                {
+                    "action": "create",
+                    "entity": "operation",
+                    "data": operation_payload(main_id),
+                },
+                {"action": "delete", "entity": "operation", "id": "missing"},
+                {
+                    "action": "create",
+                    "entity": "operation",
+                    "data": operation_payload(main_id),
+                },
+            ]
+        },
+    )
+    assert response.status_code == 400
+    body = response.json()
+    assert not body["committed"]
+    assert [result["status"] for result in body["results"]] == [200, 404, 424]
+    assert _current_amounts(client) == {"Main": 100.0, "Cash": 20.0}
+
+    response = client.post(
+        "/api/batch",
+        json={
+            "items": [
+                {"action": "create", "entity": "operation", "data": {"name": "x"}},
+                {"action": "update", "entity": "balance", "data": {}},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert [result["status"] for result in response.json()["results"]] == [422, 422]
@@ -0,0 +1,75 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, negotiate
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") == "gzip"
+    assert negotiate("") is None
+
+
+def test_large_snapshots_are_compressed(client: TestClient, association, add_operation):
+    for index in range(10):
+        add_operation(association["balances"][0]["id"], name=f"Operation {index}")
+    url = f"/api/associations/{association['id']}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert len(response.json()["operations"]) == 10
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    revalidated = client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+
+
+def test_small_responses_are_not_compressed(client: TestClient):
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_streams_are_compressed_except_events():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/export")
+    def export():
+        rows = (f"{index},row\n" for index in range(100))
+        return StreamingResponse(rows, media_type="text/csv")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: 1\n\n"]), media_type="text/event-stream")
+
+    client = TestClient(app)
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[-1] == "99,row"
+
+    with client.stream(
+        "GET", "/export", headers={"Accept-Encoding": "gzip"}
+    ) as streamed:
+        raw = b"".join(streamed.iter_raw())
+    assert gzip.decompress(raw).decode().startswith("0,row\n")
+
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "data: 1\n\n"
@@ -0,0 +1,57 @@
+import os
+
+from sqlalchemy import create_engine
+
+import database
+from database import (
+    TimedAsyncAdaptedQueuePool,
+    engine_options,
+    pool_status,
+    to_async_url,
+)
+
+
+def test_to_async_url_swaps_driver():
+    assert to_async_url("mysql+pymysql://u:p@db:3306/abacus") == (
+        "mysql+aiomysql://u:p@db:3306/abacus"
+    )
+    assert to_async_url("sqlite:///./abacus.db") == "sqlite+aiosqlite:///./abacus.db"
+
+
+def test_engine_options_configure_pool_for_mariadb():
+    options = engine_options("mysql+aiomysql://u:p@db/abacus", is_async=True)
+    assert options["echo"] is False
+    assert options["pool_pre_ping"] is True
+    assert options["poolclass"] is TimedAsyncAdaptedQueuePool
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(options)
+
+    assert "pool_size" not in engine_options("sqlite:///./abacus.db")
+
+
+def test_engines_reset_after_fork(monkeypatch):
+    monkeypatch.setattr(database, "ENGINE_PID", -1)
+    assert database.ensure_engines_for_process() is True
+    assert database.ENGINE_PID == os.getpid()
+    assert database.ensure_engines_for_process() is False
+
+
+def test_pool_status_reports_each_engine_separately(tmp_path):
+    file_url = f"sqlite:///{tmp_path / 'pool.db'}"
+    first = create_engine(file_url, **engine_options(file_url))
+    second = create_engine("sqlite://", **engine_options("sqlite://"))
+    with first.connect(), first.connect():
+        pass
+
+    status = pool_status(first)
+    assert status["pool"] == "TimedQueuePool"
+    assert status["checkouts"] == 2
+    assert status["checked_out"] == 0
+    # SQLite's pool keeps SQLAlchemy's sizing, not the DATABASE_* settings.
+    assert (status["size"], status["max_overflow"]) == (5, 10)
+
+    assert pool_status(second)["checkouts"] == 0
+    with second.connect():
+        pass
+    status = pool_status(second)
+    assert status["pool"] == "TimedSingletonThreadPool"
+    assert status["checkouts"] == 1
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from changefeed import DatabaseBroker, EventHub, event_hub
+from routers.events import event_stream
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_events_require_authentication(client: TestClient):
+    assert client.get("/api/events").status_code == 401
+
+
+@pytest.mark.anyio
+async def test_committed_writes_are_published(
+    client: TestClient, association, add_operation
+):
+    queue = event_hub.subscribe(association["id"])
+    try:
+        operation = add_operation(association["balances"][0]["id"])
+        payload = await asyncio.wait_for(queue.get(), 1)
+    finally:
+        event_hub.unsubscribe(association["id"], queue)
+
+    assert payload["revision"] == association["revision"] + 1
+    assert payload["changes"] == [
+        {"entity": "operation", "id": operation["id"], "deleted": False},
+        {"entity": "balance", "id": operation["balance_id"], "deleted": False},
+    ]
+    assert not event_hub.associations
+
+
+@pytest.mark.anyio
+async def test_event_stream_catches_up_and_keeps_alive(association, async_engine):
+    session_factory = async_sessionmaker(async_engine, class_=AsyncSession)
+    stream = event_stream(association["id"], session_factory, -1, keepalive=0.01)
+    try:
+        assert (await anext(stream)).startswith("retry:")
+        catch_up = await anext(stream)
+        assert catch_up.startswith(f"id: {association['revision']}\nevent: change")
+        assert await anext(stream) == ": keepalive\n\n"
+
+        event_hub.deliver(association["id"], {"revision": 99, "changes": []})
+        assert (await anext(stream)).startswith("id: 99\n")
+    finally:
+        await stream.aclose()
+    assert not event_hub.associations
+
+
+@pytest.mark.anyio
+async def test_database_broker_sees_other_writers(
+    client: TestClient, association, async_engine, add_operation
+):
+    hub = EventHub(
+        DatabaseBroker(async_sessionmaker(async_engine, class_=AsyncSession))
+    )
+    queue = hub.subscribe(association["id"])
+    await hub.broker.poll(hub)
+    assert queue.empty()
+
+    # Written through the app's own hub, as another worker would.
+    operation = add_operation(association["balances"][0]["id"])
+    await hub.broker.poll(hub)
+    payload = await asyncio.wait_for(queue.get(), 1)
+    assert payload["changes"][0]["id"] == operation["id"]
+    await hub.broker.poll(hub)
+    assert queue.empty()
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+
+def test_export_csv_and_ndjson_filter_by_balance_and_period(
+    client: TestClient, association, add_operation
+):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    add_operation(main_id, name="Jan", date="2024-01-15T00:00:00")
+    add_operation(main_id, name="Feb", date="2024-02-15T00:00:00")
+    add_operation(cash_id, name='Cash, "quoted"', type="income")
+
+    response = client.get("/api/exports/operations")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(row["name"] for row in rows) == ['Cash, "quoted"', "Feb", "Jan"]
+
+    response = client.get(
+        "/api/exports/operations",
+        params={
+            "format": "ndjson",
+            "balance_id": main_id,
+            "start": "2024-02-01T00:00:00",
+        },
+    )
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["name"] for record in records] == ["Feb"]
+    assert records[0]["type"] == "expense"
+    assert records[0]["balance_id"] == main_id
+
+    response = client.get(
+        "/api/exports/operations", params={"balance_id": "does-not-exist"}
+    )
+    assert response.status_code == 404
+
+
+def test_export_pdf_has_a_page_per_balance(
+    client: TestClient, association, add_operation
+):
+    main_id = association["balances"][0]["id"]
+    for day in range(1, 29):
+        for _ in range(3):
+            add_operation(main_id, date=f"2024-02-{day:02d}T00:00:00")
+
+    response = client.get("/api/exports/operations", params={"format": "pdf"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    body = response.content
+    assert body.startswith(b"%PDF-1.4")
+    assert body.rstrip().endswith(b"%%EOF")
+
+    # 84 operations overflow Main onto a second page; Cash gets its own page.
+    assert body.count(b"/Type /Page ") == 3
+    assert b"/Count 3" in body
+
+    # Every cross-reference entry points at its object.
+    startxref = int(body.rsplit(b"startxref\n", 1)[1].split(b"\n", 1)[0])
+    entries = body[startxref:].split(b"\n")[3:]
+    for object_id, entry in enumerate(entries, start=1):
+        if not entry.endswith(b" n "):
+            break
+        offset = int(entry[:10])
+        assert body[offset:].startswith(b"%d 0 obj" % object_id)
+
+
+def test_export_pdf_opening_balance_includes_earlier_operations(
+    client: TestClient, association, add_operation
+):
+    main_id = association["balances"][0]["id"]
+    add_operation(main_id, amount=11.33, type="income", date="2024-01-15T00:00:00")
+    add_operation(main_id, amount=10.0, date="2024-02-15T00:00:00")
+
+    response = client.get(
+        "/api/exports/operations",
+        params={"format": "pdf", "balance_id": main_id, "start": "2024-02-01"},
+    )
+    assert response.status_code == 200
+    body = response.content
+    # Opening: 100 + 11.33 from January; closing after February's expense.
+    assert b"(111.33) Tj" in body
+    assert b"(101.33) Tj" in body
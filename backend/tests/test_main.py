@@ -5,3 +5,9 @@ def test_health_check(client: TestClient):
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_pool_health(client: TestClient):
+    response = client.get("/health/pool")
+    assert response.status_code == 200
+    assert {"pool", "checkouts", "wait_seconds_max"} <= set(response.json())
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import request_metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    request_metrics.reset()
+    monkeypatch.setattr(request_metrics, "enabled", True)
+    yield request_metrics
+    request_metrics.reset()
+
+
+def _sample(text: str, prefix: str) -> float:
+    return next(
+        float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith(prefix)
+    )
+
+
+def test_metrics_are_disabled_by_default(client: TestClient, association):
+    request_metrics.reset()
+    assert client.get("/metrics").status_code == 404
+    assert not request_metrics.requests
+
+
+def test_requests_are_recorded_per_route(client: TestClient, association, metrics):
+    balance_id = association["balances"][0]["id"]
+    client.get(f"/api/balances/{balance_id}/summary")
+    client.get("/api/me")
+    client.get("/api/me")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    labels = '{route="/api/me",method="GET"'
+    assert f'abacus_requests_total{labels},status="200"}} 2' in text
+    assert 'route="/api/balances/{balance_id}/summary"' in text
+    assert balance_id not in text
+    # Four statements per snapshot: the revision for the ETag, then the
+    # association, its balances and their operations.
+    assert _sample(text, f"abacus_request_db_statements_sum{labels}") == 8
+    assert _sample(text, f"abacus_request_db_duration_seconds_sum{labels}") > 0
+    assert _sample(text, f"abacus_response_size_bytes_sum{labels}") > 0
+    assert _sample(text, f"abacus_response_serialization_seconds_sum{labels}") > 0
+    assert f'abacus_request_duration_seconds_bucket{labels},le="+Inf"}} 2' in text
+
+
+def test_slow_requests_are_logged_without_metrics(
+    client: TestClient, association, monkeypatch, caplog
+):
+    request_metrics.reset()
+    monkeypatch.setattr(request_metrics, "slow_request_ms", 0.001)
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        client.get("/api/me")
+    message = next(
+        record.getMessage()
+        for record in caplog.records
+        if "Slow request: GET /api/me" in record.getMessage()
+    )
+    assert "4 SQL statements" in message
+    assert "FROM operation" in message
+    assert not request_metrics.requests
@@ -0,0 +1,126 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import inspect
+from sqlmodel import Session, create_engine, select
+
+from migrations import INTEGER_CENTS, SchemaMigration, _integer_cents, run_migrations
+from models import Association, Balance, Operation
+
+# Schema as created by `create_all` before rollups and indexes existed.
+BASELINE_SCHEMA = [
+    "CREATE TABLE association (id VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, "
+    "password VARCHAR NOT NULL)",
+    "CREATE TABLE balance (id VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, "
+    '"initialAmount" FLOAT NOT NULL, '
+    "association_id VARCHAR REFERENCES association (id), position INTEGER NOT NULL)",
+    "CREATE TABLE operation (id VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, "
+    'description VARCHAR NOT NULL, "group" VARCHAR NOT NULL, amount FLOAT NOT NULL, '
+    "type VARCHAR(7) NOT NULL, date DATETIME NOT NULL, invoice VARCHAR, "
+    "balance_id VARCHAR REFERENCES balance (id))",
+    "INSERT INTO association VALUES ('a1', 'Old', 'x')",
+    "INSERT INTO balance VALUES ('b1', 'Main', 100.0, 'a1', 0)",
+    "INSERT INTO operation VALUES ('o1', 'Op', '', 'misc', 30.0, 'EXPENSE', "
+    "'2024-01-15 00:00:00.000000', NULL, 'b1')",
+]
+
+
+def test_migrations_upgrade_baseline_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+    applied = run_migrations(engine)
+    assert applied == [
+        "0001_balance_rollups",
+        "0002_hot_path_indexes",
+        "0003_association_revision",
+        "0004_change_log",
+        "0005_integer_cents",
+        "0006_operation_attachments",
+    ]
+    assert run_migrations(engine) == []
+
+    inspector = inspect(engine)
+    assert {"ix_association_name"} <= {
+        index["name"] for index in inspector.get_indexes("association")
+    }
+    with Session(engine) as session:
+        balance = session.get(Balance, "b1")
+        assert balance.expenseTotal == 30.0
+        assert balance.currentAmount == 70.0
+        stored = session.connection().exec_driver_sql("SELECT amount FROM operation")
+        assert stored.scalar() == 3000
+
+
+def test_integer_cents_runs_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+    run_migrations(engine)
+
+    # As if the run had stopped before recording the migration as applied.
+    with Session(engine) as session:
+        session.delete(session.get(SchemaMigration, INTEGER_CENTS))
+        session.commit()
+    assert run_migrations(engine) == [INTEGER_CENTS]
+    with engine.begin() as connection:
+        _integer_cents(connection)
+
+    with engine.connect() as connection:
+        stored = connection.exec_driver_sql(
+            "SELECT amount, typeof(amount) FROM operation"
+        ).one()
+        assert tuple(stored) == (3000, "integer")
+        stored = connection.exec_driver_sql(
+            'SELECT "initialAmount", typeof("initialAmount") FROM balance'
+        ).one()
+        assert tuple(stored) == (10000, "integer")
+    with Session(engine) as session:
+        assert session.get(Balance, "b1").currentAmount == 70.0
+
+
+def test_integer_cents_resumes_after_partial_run(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+        # The operation amounts were scaled and marked, the rest was not.
+        connection.exec_driver_sql("UPDATE operation SET amount = amount * 100")
+        SchemaMigration.__table__.create(connection)
+        connection.execute(
+            SchemaMigration.__table__.insert().values(
+                name=f"{INTEGER_CENTS}:operation.amount", applied_at=datetime.now(UTC)
+            )
+        )
+
+    run_migrations(engine)
+    with Session(engine) as session:
+        balance = session.get(Balance, "b1")
+        assert balance.initialAmount == 100.0
+        assert balance.expenseTotal == 30.0
+
+
+def _query_plan(session: Session, statement) -> str:
+    sql = str(
+        statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    )
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+    return " ".join(row[-1] for row in rows)
+
+
+def test_hot_queries_use_indexes(session: Session):
+    plans = {
+        "ix_association_name": select(Association).where(Association.name == "x"),
+        "ix_balance_association_id_position": select(Balance)
+        .where(Balance.association_id == "x")
+        .order_by(Balance.position),
+        "ix_operation_balance_id_date": select(Operation)
+        .where(Operation.balance_id == "x")
+        .order_by(Operation.date),
+    }
+    for index_name, statement in plans.items():
+        plan = _query_plan(session, statement)
+        assert index_name in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
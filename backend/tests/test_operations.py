@@ -0,0 +1,119 @@
+import json
+
+from fastapi.testclient import TestClient
+
+
+def test_list_operations_paginates_with_cursor(
+    client: TestClient, association, add_operation
+):
+    balance_id = association["balances"][0]["id"]
+    created = [
+        add_operation(balance_id, date=f"2024-01-0{day}T00:00:00")
+        for day in range(1, 6)
+    ]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/operations", params=params).json()
+        seen.extend(op["id"] for op in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [op["id"] for op in created]
+
+
+def test_list_operations_filters(client: TestClient, association, add_operation):
+    main_id = association["balances"][0]["id"]
+    cash_id = association["balances"][1]["id"]
+    add_operation(main_id, type="income", group="dons")
+    add_operation(main_id, date="2024-03-01T00:00:00")
+    add_operation(cash_id, group="dons")
+
+    def count(**params):
+        return len(client.get("/api/operations", params=params).json()["items"])
+
+    assert count(balance_id=main_id) == 2
+    assert count(type="income") == 1
+    assert count(group="dons") == 2
+    assert count(start="2024-02-01T00:00:00") == 1
+    assert count(end="2024-02-01T00:00:00") == 2
+
+
+def test_list_operations_rejects_invalid_cursor(client: TestClient, association):
+    response = client.get("/api/operations", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_bulk_import_csv_reports_row_errors(client: TestClient, association):
+    balance_id = association["balances"][0]["id"]
+    body = (
+        "name,description,group,amount,type,date,balance_id,invoice\n"
+        f'Rent,"Monthly, with\nnewline",loyer,40,expense,2024-01-05,{balance_id},\n'
+        f"Gift,,dons,15.5,income,2024-02-01,{balance_id},inv-1\n"
+        f"Bad,,misc,abc,expense,2024-02-01,{balance_id},\n"
+        "Foreign,,misc,1,expense,2024-02-01,not-my-balance,\n"
+    )
+    response = client.post(
+        "/api/operations/bulk",
+        content=body.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+
+    summary = client.get(f"/api/balances/{balance_id}/summary").json()
+    assert summary["currentAmount"] == 100.0 - 40.0 + 15.5
+    assert summary["groups"][0]["group"] == "dons"
+
+
+def test_bulk_import_reassembles_lines_split_across_chunks(
+    client: TestClient, association
+):
+    balance_id = association["balances"][0]["id"]
+    body = (
+        "name,description,group,amount,type,date,balance_id,invoice\r\n"
+        f'Café,"two\r\nlines",misc,12,expense,2024-01-05,{balance_id},\r\n'
+    ).encode()
+    # One byte per chunk splits the accented character and every line ending.
+    response = client.post(
+        "/api/operations/bulk",
+        content=(body[i : i + 1] for i in range(len(body))),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.json() == {"inserted": 1, "failed": 0, "errors": []}
+
+    operation = client.get("/api/operations").json()["items"][0]
+    assert operation["name"] == "Café"
+    assert operation["description"] == "two\nlines"
+
+
+def test_bulk_import_ndjson_atomic_rolls_back(
+    client: TestClient, association, operation_payload
+):
+    balance_id = association["balances"][0]["id"]
+    good = json.dumps(operation_payload(balance_id))
+    body = f"{good}\n{{not json\n"
+
+    response = client.post(
+        "/api/operations/bulk",
+        params={"atomic": True},
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["inserted"] == 0
+    assert client.get("/api/operations").json()["items"] == []
+
+    response = client.post(
+        "/api/operations/bulk",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["inserted"] == 1
+    assert response.json()["errors"][0]["row"] == 2
@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import changefeed
+from database import ReadRouter, get_read_router
+from main import app
+
+
+def _replica_factory(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture(name="replicate")
+def replicate_fixture(database_path, tmp_path):
+    """Copy the primary to a new replica file, naming its balances `label`."""
+
+    def replicate(label: str):
+        path = tmp_path / f"replica-{label}.db"
+        with sqlite3.connect(database_path) as primary, sqlite3.connect(path) as copy:
+            primary.backup(copy)
+            copy.execute("UPDATE balance SET name = ?", (label,))
+        return _replica_factory(path)
+
+    return replicate
+
+
+def _use_router(monkeypatch, router: ReadRouter):
+    app.dependency_overrides[get_read_router] = lambda: router
+    monkeypatch.setattr(changefeed, "read_router", router)
+
+
+def _served_by(client: TestClient) -> str:
+    response = client.get("/api/me")
+    assert response.status_code == 200
+    return response.json()["balances"][0]["name"]
+
+
+def test_reads_use_replicas_round_robin(client, association, replicate, monkeypatch):
+    _use_router(monkeypatch, ReadRouter([replicate("A"), replicate("B")]))
+
+    assert [_served_by(client) for _ in range(4)] == ["A", "B", "A", "B"]
+
+
+def test_reads_follow_writes_to_the_primary(
+    client, association, replicate, monkeypatch, add_operation
+):
+    router = ReadRouter([replicate("Replica")], sticky_seconds=60)
+    _use_router(monkeypatch, router)
+    assert _served_by(client) == "Replica"
+
+    add_operation(association["balances"][0]["id"], name="Fresh")
+    me = client.get("/api/me").json()
+    assert me["balances"][0]["name"] == "Main"
+    assert [operation["name"] for operation in me["operations"]] == ["Fresh"]
+
+    # Past the window, the lagging replica is still bypassed for the body.
+    router.sticky_seconds = 0
+    assert _served_by(client) == "Main"
+
+
+def test_lagging_replica_never_serves_an_older_revision(
+    client, association, replicate, monkeypatch, add_operation
+):
+    lagging = replicate("Lagging")
+    # Written through another worker, which this one's stickiness cannot see.
+    add_operation(association["balances"][0]["id"])
+    _use_router(monkeypatch, ReadRouter([lagging], sticky_seconds=0))
+
+    response = client.get("/api/me")
+    me = response.json()
+    assert me["balances"][0]["name"] == "Main"
+    assert me["revision"] == association["revision"] + 1
+    assert f".{me['revision']}." in response.headers["etag"]
+
+    url = f"/api/associations/{association['id']}/changes"
+    changes = client.get(url, params={"since": me["revision"]}).json()
+    assert changes["revision"] == me["revision"]
+    assert not changes["full_resync"]
+
+    _use_router(monkeypatch, ReadRouter([replicate("Current")], sticky_seconds=0))
+    assert _served_by(client) == "Current"
+
+
+def test_unreachable_replica_fails_over(
+    client, association, replicate, monkeypatch, tmp_path
+):
+    broken = _replica_factory(tmp_path / "missing" / "replica.db")
+    router = ReadRouter([broken, replicate("Replica")], retry_seconds=60)
+    _use_router(monkeypatch, router)
+
+    assert [_served_by(client) for _ in range(3)] == ["Replica"] * 3
+
+    _use_router(monkeypatch, ReadRouter([broken]))
+    assert _served_by(client) == "Main"
@@ -35,7 +35,7 @@ def main():
 
     print("Starting Production Server...")
     os.environ["PYTHONPATH"] = backend_dir
-    run_command("python cli.py start --host 0.0.0.0 --port 9874 --no-reload", cwd=backend_dir)
+    run_command("python cli.py serve --host 0.0.0.0 --port 9874", cwd=backend_dir)
 
 if __name__ == "__main__":
     try:
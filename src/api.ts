@@ -12,6 +12,7 @@ interface BackendOperation {
   date: string;
   balance_id: string;
   invoice?: string;
+  attachment_id?: string | null;
 }
 
 interface BackendBalance {
@@ -231,6 +232,16 @@ export const api = {
     };
   },
 
+  async reorderBalances(balanceIds: string[]): Promise<void> {
+    const response = await fetchWithAuth(`${API_URL}/balances/order`, {
+      method: 'PUT',
+      body: JSON.stringify({ balance_ids: balanceIds }),
+    });
+    if (!response.ok) {
+      throw new Error('Failed to reorder balances');
+    }
+  },
+
   async deleteBalance(balanceId: string): Promise<void> {
     const response = await fetchWithAuth(`${API_URL}/balances/${balanceId}`, {
       method: 'DELETE',
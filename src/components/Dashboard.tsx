@@ -1,7 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Association, Balance, Operation, OperationType } from '../types';
 import { startOfMonth, endOfMonth } from 'date-fns';
-import { useDeleteBalance, useDeleteOperation, useUpdateBalance } from '../hooks/useAbacusData';
+import { useDeleteBalance, useDeleteOperation, useReorderBalances } from '../hooks/useAbacusData';
 
 // Components
 import Header from './Header';
@@ -67,7 +67,7 @@ const Dashboard: React.FC<DashboardProps> = ({ association, onLogout }) => {
   // --- Mutations ---
   const deleteOperationMutation = useDeleteOperation();
   const deleteBalanceMutation = useDeleteBalance();
-  const updateBalanceMutation = useUpdateBalance();
+  const reorderBalancesMutation = useReorderBalances();
 
   // --- Computed Data ---
   const filteredOperations = useMemo(() => {
@@ -173,13 +173,9 @@ const Dashboard: React.FC<DashboardProps> = ({ association, onLogout }) => {
     const [draggedBalance] = sortedBalances.splice(draggedBalanceIndex, 1);
     sortedBalances.splice(dropIndex, 0, draggedBalance);
 
-    // Update all affected balances
-    const updates = sortedBalances.map((b, index) => ({ ...b, position: index }));
-
-    // Ideally we would update local state via a specialized hook or optimistic update in React Query
-    // For now, we fire requests.
+    // Send the whole new order at once; the backend rewrites every position.
     try {
-      await Promise.all(updates.map((b) => updateBalanceMutation.mutateAsync(b)));
+      await reorderBalancesMutation.mutateAsync(sortedBalances.map((b) => b.id));
     } catch (err) {
       console.error('Failed to reorder', err);
     }
@@ -120,6 +120,16 @@ export function useUpdateBalance() {
   });
 }
 
+export function useReorderBalances() {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: (balanceIds: string[]) => api.reorderBalances(balanceIds),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['association'] });
+    },
+  });
+}
+
 export function useDeleteBalance() {
   const queryClient = useQueryClient();
   return useMutation({
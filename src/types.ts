@@ -13,6 +13,7 @@ export interface Operation {
   type: OperationType;
   date: string;
   invoice?: string;
+  attachment_id?: string | null;
 }
 
 export interface Balance {